@@ -1,2 +1,8 @@
 """App that provides abstractions for reaktor objects. Uses API wrapper from `barrel` app.
 """
+
+
+class RpcError(Exception):
+    """A reaktor JSON-RPC call failed: the response carries an error, or is
+    not a JSON-RPC response.
+    """
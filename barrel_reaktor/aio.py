@@ -0,0 +1,147 @@
+"""Asyncio counterparts of the model class methods.
+
+Decorating a model with `async_twins` adds an `a<name>` class method for each
+public class method making reaktor calls, e.g.
+`await Document.aget_by_id(token, doc_id)`. Twins call the regular method,
+so they share fields and data converters with it. Methods that only touch
+local state, or return iterators, are marked `sync_only` and get no twin.
+
+How the call is run is decided by the runner. Without one, twins run in a
+bounded thread pool shared by all twins. Installing the runner of a
+non-blocking transport removes the threads:
+
+    aio.set_runner(AsyncJsonRpcClient(url).run)
+
+Such a runner (see `barrel_reaktor.aiorpc`) runs the method on the event
+loop thread as a `Replay`: whenever the method makes a reaktor call whose
+response is not known yet, `RpcMixin.signature` raises `Pending`; the runner
+awaits the response and runs the method again, this time getting the
+response, until the method returns. Responses are recorded by interface,
+method and arguments, so a run may make other calls than the previous one
+(e.g. once a cache has been filled by it), as long as the calls it makes
+again with the same arguments may get the same response.
+"""
+import functools
+import threading
+
+from barrel_reaktor.singleflight import Group
+
+try:
+    import asyncio
+except ImportError:  # python 2
+    asyncio = None
+
+
+# Size of the thread pool used by the default runner.
+max_workers = 32
+_executor = None
+_runner = None
+_local = threading.local()
+
+
+def default_runner(func, *args, **kwargs):
+    """Runs `func` in the shared executor of the running event loop."""
+    global _executor
+    if _executor is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _executor = ThreadPoolExecutor(max_workers=max_workers)
+    loop = asyncio.get_event_loop()
+    return loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+def set_runner(runner):
+    """`runner(func, *args, **kwargs)` must return an awaitable.
+    Passing `None` restores the default runner.
+    """
+    global _runner
+    _runner = runner
+
+
+def run(func, *args, **kwargs):
+    return (_runner or default_runner)(func, *args, **kwargs)
+
+
+class Pending(BaseException):
+    """Raised by `signature` while replaying a method, for a call whose
+    response is not known yet. Not an `Exception`, so that the `except
+    Exception` clauses of the models let it through.
+    """
+    def __init__(self, interface, method, params):
+        super(Pending, self).__init__(interface, method)
+        self.interface = interface
+        self.method = method
+        self.params = params
+
+
+def convert(data_converter, data):
+    """Applies a data converter to a reaktor response, as barrel does."""
+    if data is None:
+        return None
+    if isinstance(data, list):
+        return [data_converter(item) for item in data]
+    return data_converter(data)
+
+
+class Replay(object):
+    """Responses of the reaktor calls made by a method, by call."""
+    def __init__(self):
+        self.responses = {}
+
+    @staticmethod
+    def key(interface, method, args):
+        return Group.key(interface, method, None, args)
+
+    def run(self, func, args, kwargs):
+        """Runs `func` from the start, raising `Pending` at the first call
+        without a recorded response.
+        """
+        previous = getattr(_local, 'replay', None)
+        _local.replay = self
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.replay = previous
+
+    def record(self, pending, value=None, error=None):
+        self.responses[self.key(pending.interface, pending.method, pending.params)] = (value, error)
+
+    def signature(self, interface, method, data_converter, args):
+        try:
+            value, error = self.responses[self.key(interface, method, args)]
+        except KeyError:
+            raise Pending(interface, method, args)
+        if error is not None:
+            raise error
+        return convert(data_converter, value)
+
+
+def replaying():
+    """Returns the `Replay` running in this thread, if any."""
+    return getattr(_local, 'replay', None)
+
+
+def sync_only(func):
+    """Marks a class method as not needing an awaitable twin. Goes below
+    `@classmethod`.
+    """
+    func.sync_only = True
+    return func
+
+
+def _twin(name):
+    def method(cls, *args, **kwargs):
+        return run(getattr(cls, name), *args, **kwargs)
+    method.__name__ = 'a%s' % name
+    method.__doc__ = 'Awaitable version of `%s`.' % name
+    return classmethod(method)
+
+
+def async_twins(cls):
+    """Class decorator adding awaitable twins of the public class methods
+    that are not marked `sync_only`.
+    """
+    for name, attr in list(vars(cls).items()):
+        if isinstance(attr, classmethod) and not name.startswith('_') \
+                and not getattr(attr.__func__, 'sync_only', False):
+            setattr(cls, 'a%s' % name, _twin(name))
+    return cls
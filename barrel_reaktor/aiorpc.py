@@ -0,0 +1,135 @@
+"""Non-blocking reaktor transport for the asyncio twins (python 3 only).
+
+    client = AsyncJsonRpcClient('https://reaktor.example.com/json-rpc')
+    aio.set_runner(client.run)
+    document = await Document.aget_by_id(token, doc_id)
+
+Calls are posted as JSON-RPC over keep-alive HTTP/1.1 connections opened
+with asyncio streams, `max_connections` at most, so that waiting for reaktor
+holds no thread. Model methods are run with `aio.Replay` (see
+`barrel_reaktor.aio`). The calls made this way skip singleflight, the
+resilience policy and instrumentation, which are tied to the blocking
+transport.
+"""
+import asyncio
+import itertools
+import json
+import ssl
+from urllib.parse import urlsplit
+
+from holon import ReaktorArgumentError
+
+from barrel_reaktor import RpcError, aio
+
+
+class AsyncJsonRpcClient(object):
+    def __init__(self, url, timeout=30, max_connections=100, ssl_context=None):
+        parts = urlsplit(url)
+        secure = parts.scheme == 'https'
+        self.host = parts.hostname
+        self.port = parts.port or (443 if secure else 80)
+        self.path = (parts.path or '/') + ('?%s' % parts.query if parts.query else '')
+        self.ssl = ssl_context or (ssl.create_default_context() if secure else None)
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._ids = itertools.count(1)
+        self._idle = []
+        self._slots = None
+
+    async def run(self, func, *args, **kwargs):
+        """Runner for `aio.set_runner`."""
+        replay = aio.Replay()
+        while True:
+            try:
+                return replay.run(func, args, kwargs)
+            except aio.Pending as pending:
+                try:
+                    value = await self.call(pending.interface, pending.method, pending.params)
+                except Exception as e:
+                    replay.record(pending, error=e)
+                else:
+                    replay.record(pending, value)
+
+    async def call(self, interface, method, args):
+        """Returns the `result` of the call, or raises its error."""
+        body = json.dumps({'id': next(self._ids), 'method': '%s.%s' % (interface, method), 'params': args})
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_connections)
+        async with self._slots:
+            status, payload = await asyncio.wait_for(self._post(body.encode('utf-8')), self.timeout)
+        try:
+            response = json.loads(payload.decode('utf-8'))
+        except ValueError:
+            raise RpcError('HTTP %s: %r' % (status, payload[:200]))
+        if response.get('error'):
+            raise self.error(response['error'])
+        if status != 200:
+            raise RpcError('HTTP %s' % status)
+        return response.get('result')
+
+    def error(self, error):
+        """Maps a JSON-RPC error to an exception, `ReaktorArgumentError` for
+        reaktor argument exceptions as the blocking transport does.
+        """
+        message = error.get('message') if isinstance(error, dict) else error
+        if 'Argument' in json.dumps(error):
+            return ReaktorArgumentError(message)
+        return RpcError(message)
+
+    async def _post(self, body):
+        # A reused connection may have been closed by the server meanwhile:
+        # only then is the request sent again, on a new connection.
+        while True:
+            reused = bool(self._idle)
+            reader, writer = self._idle.pop() if reused else await asyncio.open_connection(
+                self.host, self.port, ssl=self.ssl)
+            try:
+                writer.write(('POST %s HTTP/1.1\r\nHost: %s\r\nContent-Type: application/json\r\n'
+                              'Content-Length: %d\r\nConnection: keep-alive\r\n\r\n'
+                              % (self.path, self.host, len(body))).encode('latin-1') + body)
+                await writer.drain()
+                status_line = await reader.readline()
+                if not status_line:
+                    raise ConnectionResetError('Connection closed by reaktor')
+                status, keep_alive, payload = await self._read(status_line, reader)
+            except ConnectionError:
+                writer.close()
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            if keep_alive:
+                self._idle.append((reader, writer))
+            else:
+                writer.close()
+            return status, payload
+
+    async def _read(self, status_line, reader):
+        version, status = status_line.decode('latin-1').split(None, 2)[:2]
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if not size:
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            payload = b''.join(chunks)
+        elif 'content-length' in headers:
+            payload = await reader.readexactly(int(headers['content-length']))
+        else:
+            payload = await reader.read()
+            keep_alive = False
+        return int(status), keep_alive, payload
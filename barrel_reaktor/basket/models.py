@@ -1,31 +1,36 @@
+from collections import namedtuple
 from barrel import Store, Field, BooleanField, DateField, EmbeddedStoreField
-from barrel.rpc import RpcMixin
+from barrel_reaktor.aio import async_twins
 from barrel_reaktor.document.models import Document
-from barrel_reaktor.models import Price
+from barrel_reaktor.instrumentation import timed
+from barrel_reaktor.models import MemoMixin, Price, memoized_fields, memoized_property
+from barrel_reaktor.rpc import RpcMixin
+from barrel_reaktor.shopping_list.models import Preorderlist
 from barrel_reaktor.voucher.models import Voucher
 from money import Money
 
 
-class Item(Store):
+@async_twins
+class Item(MemoMixin, Store):
     """Base item class, to be extended for specific purposes."""
     _total = EmbeddedStoreField(target='positionTotal', store_class=Price)
     _net_total = EmbeddedStoreField(target='positionNetTotal', store_class=Price)
     _tax_total = EmbeddedStoreField(target='positionTaxTotal', store_class=Price)
     _undiscounted_total = EmbeddedStoreField(target='undiscountedPositionTotal', store_class=Price)
 
-    @property
+    @memoized_property
     def total(self):
         return Money(amount=self._total.amount, currency=self._total.currency)
 
-    @property
+    @memoized_property
     def net_total(self):
         return Money(amount=self._net_total.amount, currency=self._net_total.currency)
 
-    @property
+    @memoized_property
     def tax_total(self):
         return Money(amount=self._tax_total.amount, currency=self._tax_total.currency)
 
-    @property
+    @memoized_property
     def undiscounted_total(self):
         return Money(amount=self._undiscounted_total.amount, currency=self._undiscounted_total.currency)
 
@@ -40,6 +45,7 @@ class Item(Store):
         return cls.set_basket_quantity(token, basket_id, item_id, 0)
 
 
+@async_twins
 class DocumentItem(Item, RpcMixin):
     """Abstraction for `BasketPosition` reaktor object, that stores `Document`."""
     interface = 'WSDocMgmt'
@@ -68,7 +74,8 @@ class GiftCardItem(Item, RpcMixin):
         raise NotImplemented
 
 
-class VoucherItem(Store, RpcMixin):
+@async_twins
+class VoucherItem(MemoMixin, Store, RpcMixin):
     """Abstraction for `VoucherApplication` reaktor object, that stores `Voucher`."""
     interface = 'WSVoucherMgmt'
 
@@ -80,7 +87,7 @@ class VoucherItem(Store, RpcMixin):
     voucher = EmbeddedStoreField(target='voucher', store_class=Voucher)
     _discount = EmbeddedStoreField(target='discountAmount', store_class=Price)
 
-    @property
+    @memoized_property
     def discount(self):
         return Money(amount=self._discount.amount, currency=self._discount.currency)
 
@@ -103,6 +110,7 @@ class VoucherItem(Store, RpcMixin):
         return cls.signature(method='assignVoucherToUserAccount', args=[token, code], data_converter=cls.Result)
 
 
+@timed
 def item_factory(data=None):
     """Item factory to get properly typed basket items."""
     if data is None:
@@ -114,6 +122,7 @@ def item_factory(data=None):
         return GiftCardItem(data)
     else:
         raise ValueError('Basket item type not supported: %s' % item_type)
+item_factory.store_classes = (Item, DocumentItem, GiftCardItem)
 
 
 class CheckoutProperties(Store):
@@ -125,7 +134,12 @@ class CheckoutProperties(Store):
     external_transaction_id = Field(target='externalTransactionID')
 
 
-class Basket(Store, RpcMixin):
+Summary = namedtuple('Summary', 'total net_total tax_total undiscounted_total is_regular is_preorder')
+
+
+@async_twins
+@memoized_fields
+class Basket(MemoMixin, Store, RpcMixin):
     interface = 'WSShopMgmt'
 
     # txtr to adyen mapping of payment methods;
@@ -158,39 +172,56 @@ class Basket(Store, RpcMixin):
     authorized_payment_methods = Field(target='authorizedPaymentMethods')
     vouchers = EmbeddedStoreField(target='voucherApplications', store_class=VoucherItem, is_array=True)
 
-    @property
+    @memoized_property
     def total(self):
         return Money(amount=self._total.amount, currency=self._total.currency)
 
-    @property
+    @memoized_property
     def net_total(self):
         return Money(amount=self._net_total.amount, currency=self._net_total.currency)
 
-    @property
+    @memoized_property
     def tax_total(self):
         return Money(amount=self._tax_total.amount, currency=self._tax_total.currency)
 
-    @property
+    @memoized_property
     def undiscounted_total(self):
         return Money(amount=self._undiscounted_total.amount, currency=self._undiscounted_total.currency)
 
+    @memoized_property
+    def _positions(self):
+        """Basket items grouped by type, built in a single pass."""
+        positions = {DocumentItem: [], GiftCardItem: []}
+        for item in self.items:
+            for item_type, items in positions.items():
+                if isinstance(item, item_type):
+                    items.append(item)
+        return positions
+
+    @memoized_property
+    def _order_types(self):
+        """Returns a `(is_regular, is_preorder)` tuple, built in a single pass."""
+        is_regular = is_preorder = False
+        for document in self.documents:
+            if document.is_preorder:
+                is_preorder = True
+            else:
+                is_regular = True
+        return is_regular, is_preorder
+
     @property
     def document_items(self):
         """A property that allows to iterate over the document items.
-        Returns generator.
+        Returns iterator.
         """
-        for item in self.items:
-            if isinstance(item, DocumentItem):
-                yield item
+        return iter(self._positions[DocumentItem])
 
     @property
     def giftcard_items(self):
         """A property that allows to iterate over the gift card items.
-        Returns generator.
+        Returns iterator.
         """
-        for item in self.items:
-            if isinstance(item, GiftCardItem):
-                yield item
+        return iter(self._positions[GiftCardItem])
 
     @property
     def documents(self):
@@ -211,12 +242,18 @@ class Basket(Store, RpcMixin):
     @property
     def is_regular(self):
         """Return `True` if at least one document in the basket is regular (i.e. not a preorder)."""
-        return any(map(lambda d: not d.is_preorder, self.documents))
+        return self._order_types[0]
 
     @property
     def is_preorder(self):
         """Return `True` if at least one document in the basket is a preorder."""
-        return any(map(lambda d: d.is_preorder, self.documents))
+        return self._order_types[1]
+
+    def summary(self):
+        """Returns all the totals and the preorder flags at once, as a `Summary`."""
+        is_regular, is_preorder = self._order_types
+        return Summary(self.total, self.net_total, self.tax_total, self.undiscounted_total,
+                       is_regular, is_preorder)
 
     def is_authorized_for(self, payment_method):
         """Check whether the basket is authorized for the given payment_method.
@@ -254,8 +291,12 @@ class Basket(Store, RpcMixin):
 
     @classmethod
     def checkout(cls, token, basket_id, checkout_props):
-        return cls.signature(method='checkoutBasketAsynchronously', data_converter=CheckoutResult,
-                             args=[token, basket_id, checkout_props])
+        result = cls.signature(method='checkoutBasketAsynchronously', data_converter=CheckoutResult,
+                               args=[token, basket_id, checkout_props])
+        # Preorders are only added to the preorder list by a checkout.
+        if Preorderlist.membership is not None:
+            Preorderlist.membership.invalidate(token)
+        return result
 
     @classmethod
     def create(cls, token, marker=None):
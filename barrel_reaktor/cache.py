@@ -0,0 +1,259 @@
+"""Caching helpers shared by the reaktor models.
+
+`LRUCache` is a bounded in-process cache with a per-entry time to live.
+`StoreCache` puts it in front of an optional shared backend (anything with
+a memcached-like `get_many` / `set_many` / `delete_many` API, e.g. a django
+cache) and scopes keys by token, since reaktor payloads such as documents
+embed the state of the user (purchases, votes, tags, delivery urls). Only
+data that does not depend on the user may be scoped by `nature_of`.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+def token_scope(token):
+    """Default cache scope: the token itself."""
+    return token
+
+
+def nature_of(token):
+    """Cache scope for data shared by all the users of a nature. The nature
+    of a token never changes, so it is only fetched once per token.
+    """
+    nature = natures.get(token)
+    if nature is None:
+        from barrel_reaktor.user.models import User
+        nature = User.get_by_token(token).nature
+        natures.set(token, nature)
+    return nature
+
+
+class LRUCache(object):
+    """Thread safe least recently used cache, bounded by `max_size` entries.
+    Entries expire `ttl` seconds after they have been set; `None` disables
+    expiration.
+    """
+    def __init__(self, max_size=1000, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.get(key, _missing) is not _missing
+
+    def _get(self, key, now):
+        try:
+            expires, value = self._entries.pop(key)
+        except KeyError:
+            return _missing
+        if expires is not None and expires <= now:
+            return _missing
+        self._entries[key] = (expires, value)
+        return value
+
+    def _set(self, key, value, expires):
+        self._entries.pop(key, None)
+        self._entries[key] = (expires, value)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _expires(self, ttl):
+        ttl = self.ttl if ttl is None else ttl
+        return None if ttl is None else time.time() + ttl
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._get(key, time.time())
+        return default if value is _missing else value
+
+    def get_many(self, keys):
+        """Returns a dict of the found entries only."""
+        found = {}
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                value = self._get(key, now)
+                if value is not _missing:
+                    found[key] = value
+        return found
+
+    def set(self, key, value, ttl=None):
+        expires = self._expires(ttl)
+        with self._lock:
+            self._set(key, value, expires)
+
+    def set_many(self, mapping, ttl=None):
+        expires = self._expires(ttl)
+        with self._lock:
+            for key, value in mapping.items():
+                self._set(key, value, expires)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class StoreCache(object):
+    """Two tier cache for `Store` instances.
+
+    Hits are served from the local `LRUCache`; misses fall back to the
+    `shared` backend, which only ever sees the raw reaktor data so that
+    it can be shared between processes, encoded by `codec` if given (see
+    `barrel_reaktor.codec.Codec`). `scope` maps a token to the part of the
+    key that depends on it, the token itself by default.
+    """
+    def __init__(self, store_class, max_size=1000, ttl=300, shared=None,
+                 shared_ttl=None, scope=token_scope, prefix='barrel_reaktor', codec=None):
+        self.store_class = store_class
+        self.codec = codec
+        self.local = LRUCache(max_size=max_size, ttl=ttl)
+        self.shared = shared
+        self.shared_ttl = ttl if shared_ttl is None else shared_ttl
+        self.scope = scope
+        self.prefix = '%s:%s' % (prefix, store_class.__name__)
+
+    def keys(self, token, ids):
+        """Returns a dict mapping cache keys to the given ids."""
+        scope = self.scope(token)
+        return dict(('%s:%s:%s' % (self.prefix, scope, i), i) for i in ids)
+
+    def key(self, token, id):
+        return list(self.keys(token, [id]))[0]
+
+    def dump(self, store):
+        if self.codec is not None:
+            return self.codec.dumps(store)
+        return store.data
+
+    def load(self, data):
+        """Returns the store, or `None` if the data cannot be decoded."""
+        if self.codec is not None:
+            return self.codec.loads(data)
+        return self.store_class(data)
+
+    def get_many(self, keys):
+        found = self.local.get_many(keys)
+        if self.shared is not None and len(found) < len(keys):
+            missing = [k for k in keys if k not in found]
+            loaded = {}
+            for key, data in (self.shared.get_many(missing) or {}).items():
+                store = None if data is None else self.load(data)
+                if store is not None:
+                    loaded[key] = store
+            self.local.set_many(loaded)
+            found.update(loaded)
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def set_many(self, mapping):
+        self.local.set_many(mapping)
+        if self.shared is not None:
+            self.shared.set_many(dict((k, self.dump(v)) for k, v in mapping.items()),
+                                 self.shared_ttl)
+
+    def set(self, key, store):
+        self.set_many({key: store})
+
+    def delete_many(self, keys):
+        self.local.delete_many(keys)
+        if self.shared is not None:
+            self.shared.delete_many(keys)
+
+
+_missing = object()
+# Nature of the tokens seen by `nature_of`.
+natures = LRUCache(max_size=10000, ttl=3600)
+
+
+class IsbnIndex(object):
+    """Maps isbns to document ids, scoped like `StoreCache`. Isbns that
+    resolve to no document are remembered as `MISSING` for `negative_ttl`
+    seconds. A `shared` backend makes the index outlive the process.
+    """
+    MISSING = ''
+
+    def __init__(self, max_size=100000, ttl=86400, negative_ttl=3600, shared=None,
+                 scope=nature_of, prefix='barrel_reaktor:isbn'):
+        self.local = LRUCache(max_size=max_size, ttl=ttl)
+        self.shared = shared
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.scope = scope
+        self.prefix = prefix
+
+    def keys(self, token, isbns):
+        scope = self.scope(token)
+        return dict(('%s:%s:%s' % (self.prefix, scope, isbn), isbn) for isbn in isbns)
+
+    def lookup(self, token, isbns):
+        """Returns a dict mapping the known isbns to a document id or `MISSING`."""
+        keys = self.keys(token, isbns)
+        found = self.local.get_many(keys)
+        if self.shared is not None and len(found) < len(keys):
+            loaded = self.shared.get_many([k for k in keys if k not in found]) or {}
+            loaded = dict((k, v) for k, v in loaded.items() if v is not None)
+            self.local.set_many(loaded)
+            found.update(loaded)
+        return dict((keys[k], v) for k, v in found.items())
+
+    def forget(self, token, isbns):
+        keys = list(self.keys(token, isbns))
+        self.local.delete_many(keys)
+        if self.shared is not None:
+            self.shared.delete_many(keys)
+
+    def remember(self, token, doc_ids, missing=()):
+        """Stores the `isbn -> doc_id` mapping and the `missing` isbns."""
+        for mapping, ttl in ((self.keys(token, doc_ids), self.ttl),
+                             (self.keys(token, missing), self.negative_ttl)):
+            if not mapping:
+                continue
+            values = dict((k, doc_ids.get(isbn, self.MISSING)) for k, isbn in mapping.items())
+            self.local.set_many(values, ttl)
+            if self.shared is not None:
+                self.shared.set_many(values, ttl)
+
+
+class MissingCache(object):
+    """Remembers, for `ttl` seconds, the ids reaktor had nothing for, so that
+    looking them up again fails without a round trip. Ids are scoped by
+    token by default, since whether a user document can be found depends on
+    who is asking.
+    """
+    def __init__(self, max_size=10000, ttl=60, scope=token_scope):
+        self.local = LRUCache(max_size=max_size, ttl=ttl)
+        self.scope = scope
+
+    def keys(self, token, ids):
+        scope = self.scope(token)
+        return dict(((scope, i), i) for i in ids)
+
+    def get(self, token, ids):
+        """Returns the set of the given ids known to be missing."""
+        keys = self.keys(token, ids)
+        return set(keys[k] for k in self.local.get_many(keys))
+
+    def add(self, token, ids):
+        self.local.set_many(dict.fromkeys(self.keys(token, ids), True))
+
+    def discard(self, token, ids):
+        self.local.delete_many(list(self.keys(token, ids)))
+
+    def clear(self):
+        self.local.clear()
@@ -1,5 +1,9 @@
+import threading
+import time
 from barrel import Store, Field, IntField
-from barrel.rpc import RpcMixin
+from barrel_reaktor.aio import async_twins, sync_only
+from barrel_reaktor.pagination import iter_items
+from barrel_reaktor.rpc import RpcMixin
 
 
 def document_converter(*args, **kwargs):
@@ -7,8 +11,115 @@ def document_converter(*args, **kwargs):
     return Document(*args, **kwargs)
 
 
+class CategoryIndex(object):
+    """Index of the category tree, shared by the whole process.
+    Categories can be added in any order; trails stop at the oldest known
+    ancestor when part of the tree is missing. A known category is replaced
+    by the next copy added more than `ttl` seconds after it, so that renames
+    and moves show up without rebuilding the index; past `max_size`
+    categories, the index is cleared.
+    """
+    def __init__(self, ttl=3600, max_size=100000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.categories = {}
+        self._added = {}
+        self._children = {}
+        self._trails = {}
+        self._subtrees = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.categories)
+
+    def __contains__(self, cat_id):
+        return cat_id in self.categories
+
+    def _is_fresh(self, cat_id, now):
+        added = self._added.get(cat_id)
+        return added is not None and (self.ttl is None or now - added < self.ttl)
+
+    def add(self, categories, replace=False):
+        """Indexes the given categories. Fresh known ones are skipped, unless
+        `replace` is set, e.g. to replace the partial categories embedded in
+        documents with full ones.
+        """
+        now = time.time()
+        new = [c for c in categories or [] if c is not None and (replace or not self._is_fresh(c.id, now))]
+        if not new:
+            return
+        with self._lock:
+            if len(self.categories) + len(new) > self.max_size:
+                self.categories, self._added, self._children = {}, {}, {}
+            for category in new:
+                previous = self.categories.get(category.id)
+                if previous is not None and previous.parent_id and previous.parent_id != category.parent_id:
+                    self._children.get(previous.parent_id, set()).discard(category.id)
+                self.categories[category.id] = category
+                self._added[category.id] = now
+                if category.parent_id:
+                    self._children.setdefault(category.parent_id, set()).add(category.id)
+                for child_id in category.children_ids or []:
+                    self._children.setdefault(category.id, set()).add(child_id)
+            # new dicts, so that trails being computed meanwhile land in the
+            # discarded ones
+            self._trails = {}
+            self._subtrees = {}
+
+    def get(self, cat_id):
+        return self.categories.get(cat_id)
+
+    def parent(self, cat_id):
+        category = self.categories.get(cat_id)
+        return category and self.categories.get(category.parent_id)
+
+    def children(self, cat_id):
+        return [self.categories[c] for c in self._children.get(cat_id, ()) if c in self.categories]
+
+    def trail(self, cat_id):
+        """Returns a tuple of categories in tree order, from the oldest
+        ancestor to the given category.
+        """
+        trails = self._trails
+        try:
+            return trails[cat_id]
+        except KeyError:
+            pass
+        trail = []
+        seen = set()
+        category = self.categories.get(cat_id)
+        while category is not None and category.id not in seen:
+            seen.add(category.id)
+            trail.append(category)
+            category = self.categories.get(category.parent_id)
+        trail = trails[cat_id] = tuple(reversed(trail))
+        return trail
+
+    def ancestors(self, cat_id):
+        return self.trail(cat_id)[:-1]
+
+    def subtree(self, cat_id):
+        """Returns a frozenset with the ids of the category and all its descendants."""
+        subtrees = self._subtrees
+        try:
+            return subtrees[cat_id]
+        except KeyError:
+            pass
+        ids = set()
+        stack = [cat_id]
+        while stack:
+            current = stack.pop()
+            if current not in ids:
+                ids.add(current)
+                stack.extend(self._children.get(current, ()))
+        subtree = subtrees[cat_id] = frozenset(ids)
+        return subtree
+
+
+@async_twins
 class Category(Store, RpcMixin):
     interface = 'WSContentCategoryMgmt'
+    singleflight = ('getContentCategory', 'getCatalogContentCategoryRootsForUser', 'getDocumentsInContentCategory')
 
     id = Field(target='ID')
     name = Field(target='name')
@@ -20,6 +131,32 @@ class Category(Store, RpcMixin):
     parent_id = Field(target='parentID', default=False)
     total_count = IntField(target='subtreeSize')
 
+    index = CategoryIndex()
+
+    @classmethod
+    @sync_only
+    def build_index(cls, token):
+        """Walks the catalog category tree of the token and adds it to `index`,
+        replacing the categories already known.
+        """
+        queue = []
+        roots = cls.get_roots_by_token(token) or []
+        cls.index.add(roots, replace=True)
+        visited = set(root.id for root in roots)
+        for root in roots:
+            queue.extend(root.children_ids or [])
+        while queue:
+            cat_id = queue.pop()
+            if cat_id in visited:
+                continue
+            visited.add(cat_id)
+            category = cls.get_by_id(token, cat_id, with_children=True, number_of_results=0)
+            if category is None:
+                continue
+            cls.index.add([category], replace=True)
+            queue.extend(category.children_ids or [])
+        return cls.index
+
     @classmethod
     def get_by_id(cls, token, cat_id, with_children=True, offset='0', number_of_results=-1, sort=None, direction='asc'):
         invert = direction == 'desc'
@@ -37,3 +174,26 @@ class Category(Store, RpcMixin):
         return cls.signature(interface='WSDocMgmt', method='getDocumentsInContentCategory',
                              args=[token, cat_id, include_sub_cats, sort, invert, offset, number_of_results],
                              data_converter=document_converter)
+
+    @classmethod
+    @sync_only
+    def iter_document_ids(cls, token, cat_id, sort=None, direction='asc', chunk_size=500, max_in_flight=2):
+        """Yields the document ids of the category, fetched by chunks of
+        `chunk_size` with `get_by_id`, the next ones in the background.
+        """
+        def fetch(offset, number_of_results):
+            category = cls.get_by_id(token, cat_id, False, offset, number_of_results, sort, direction)
+            doc_ids = (category.document_ids or []) if category is not None else []
+            return doc_ids, len(doc_ids) == number_of_results
+        return iter_items(fetch, chunk_size, max_in_flight=max_in_flight)
+
+    @classmethod
+    @sync_only
+    def iter_documents(cls, token, cat_id, include_sub_cats=False, sort=None, direction='asc', chunk_size=100, max_in_flight=2):
+        """Streaming version of `get_documents`, yielding `Document` instances
+        fetched by chunks of `chunk_size`, the next ones in the background.
+        """
+        def fetch(offset, number_of_results):
+            documents = cls.get_documents(token, cat_id, include_sub_cats, offset, number_of_results, sort, direction) or []
+            return documents, len(documents) == number_of_results
+        return iter_items(fetch, chunk_size, max_in_flight=max_in_flight)
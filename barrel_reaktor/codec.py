@@ -0,0 +1,154 @@
+"""Compact, versioned encoding of stores for shared caches.
+
+    codec = Codec(Document)
+    blob = codec.dumps(document)
+    document = codec.loads(blob)
+
+Only the raw reaktor data is encoded, as compact JSON compressed with zlib
+when it is worth it, behind a fixed size header holding the format version
+and a digest of the field map of the store class (field names, types and
+targets, embedded stores included). `loads` checks the header in place,
+before touching the payload, and returns `None` for blobs written by
+another format version or for another field map, so that a deploy changing
+a field definition turns old entries into cache misses.
+
+Embedded stores may be given as classes, dotted paths or factories; a
+factory is expected to list the classes it can return in its
+`store_classes` attribute so that they are part of the digest.
+"""
+import hashlib
+import importlib
+import json
+import struct
+import sys
+import zlib
+
+from barrel import Field
+
+
+MAGIC = b'BR'
+VERSION = 1
+HEADER = struct.Struct('>2sBB8s')
+COMPRESSED = 1
+
+try:
+    string_types = basestring
+except NameError:  # python 3
+    string_types = str
+
+
+def fields_of(store_class):
+    """Returns a sorted list of `(name, field)` for the fields of the class,
+    inherited ones included.
+    """
+    fields = []
+    for name in sorted(dir(store_class)):
+        attr = getattr(store_class, name, None)
+        if isinstance(attr, Field):
+            fields.append((name, attr))
+    return fields
+
+
+def embedded_classes(field, owner):
+    """Returns `(classes, is_factory)` for the embedded store of the field:
+    the store classes it may decode to, and whether they are picked by a
+    factory. Dotted paths are imported, bare names are looked up in the
+    module of `owner`.
+    """
+    store_class = getattr(field, 'store_class', None)
+    if store_class is None:
+        return (), False
+    if isinstance(store_class, string_types):
+        module, _, name = store_class.rpartition('.')
+        module = importlib.import_module(module) if module else sys.modules[owner.__module__]
+        return (getattr(module, name), ), False
+    if isinstance(store_class, type):
+        return (store_class, ), False
+    return tuple(getattr(store_class, 'store_classes', ())), True
+
+
+def _describe(store_class, seen):
+    if store_class in seen:
+        return [store_class.__name__]
+    seen.add(store_class)
+    description = [store_class.__name__]
+    for name, field in fields_of(store_class):
+        entry = [name, type(field).__name__, getattr(field, 'target', None)]
+        classes, is_factory = embedded_classes(field, store_class)
+        if is_factory:
+            entry.append(getattr(field.store_class, '__name__', repr(field.store_class)))
+        entry.extend(_describe(embedded, seen) for embedded in classes)
+        description.append(entry)
+    return description
+
+
+def schema_of(store_class):
+    """Returns the 8 bytes digest of the field map of the class."""
+    description = json.dumps(_describe(store_class, set()), sort_keys=True)
+    return hashlib.sha1(description.encode('utf-8')).digest()[:8]
+
+
+def prune(data, store_class):
+    """Returns a copy of `data` holding only the keys targeted by the fields
+    of the class, recursively for embedded stores. The data of stores built
+    by a factory is kept whole, since their class depends on it.
+    """
+    if isinstance(data, list):
+        return [prune(item, store_class) for item in data]
+    if not isinstance(data, dict):
+        return data
+    pruned, whole = {}, set()
+    for name, field in fields_of(store_class):
+        target = getattr(field, 'target', None) or name
+        key, _, path = target.partition(':')
+        if key not in data:
+            continue
+        classes, is_factory = embedded_classes(field, store_class)
+        if classes and not is_factory and not path:
+            if key not in whole:
+                pruned[key] = prune(data[key], classes[0])
+        else:
+            whole.add(key)
+            pruned[key] = data[key]
+    return pruned
+
+
+class Codec(object):
+    """Encodes `store_class` instances. Payloads larger than `compress_over`
+    bytes are compressed at the given zlib `level`. With `prune`, the keys no
+    field targets are dropped, which only suits stores that never read their
+    raw data directly.
+    """
+    def __init__(self, store_class, compress_over=256, level=6, prune=False):
+        self.store_class = store_class
+        self.compress_over = compress_over
+        self.level = level
+        self.prune = prune
+        self.schema = schema_of(store_class)
+
+    def dumps(self, store):
+        data = store.data
+        if self.prune:
+            data = prune(data, self.store_class)
+        payload = json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        flags = 0
+        if self.compress_over is not None and len(payload) > self.compress_over:
+            compressed = zlib.compress(payload, self.level)
+            if len(compressed) < len(payload):
+                payload, flags = compressed, COMPRESSED
+        return HEADER.pack(MAGIC, VERSION, flags, self.schema) + payload
+
+    def loads(self, blob):
+        """Returns the decoded store, or `None` if the blob is not readable
+        by this codec.
+        """
+        try:
+            magic, version, flags, schema = HEADER.unpack_from(blob)
+        except (struct.error, TypeError):
+            return None
+        if magic != MAGIC or version != VERSION or schema != self.schema:
+            return None
+        payload = blob[HEADER.size:]
+        if flags & COMPRESSED:
+            payload = zlib.decompress(payload)
+        return self.store_class(json.loads(payload.decode('utf-8')))
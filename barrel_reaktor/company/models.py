@@ -1,5 +1,8 @@
+import threading
+import time
 from barrel import Store, Field, BooleanField, EmbeddedStoreField, IntField, SplitField
-from barrel.rpc import RpcMixin
+from barrel_reaktor.aio import async_twins
+from barrel_reaktor.rpc import RpcMixin
 
 
 class PasswordPolicy(Store):
@@ -9,6 +12,7 @@ class PasswordPolicy(Store):
     rules = SplitField(target='rules', default=[])
 
 
+@async_twins
 class Nature(Store, RpcMixin):
     interface = 'WSReaktorMgmt'
 
@@ -36,11 +40,19 @@ class Nature(Store, RpcMixin):
     shop_url = Field(target='shopUrl')
     vendor_id_enabled = Field(target='vendorIdEnabled')
 
+    # Set to a started `NatureRegistry` to serve natures from memory.
+    registry = None
+
     @classmethod
     def get_by_name(cls, name):
+        if cls.registry is not None:
+            nature = cls.registry.get(name)
+            if nature is not None:
+                return nature
         return cls.signature(method='getNature', args=[name])
 
 
+@async_twins
 class Company(Store, RpcMixin):
     interface = 'WSReaktorMgmt'
 
@@ -50,4 +62,59 @@ class Company(Store, RpcMixin):
 
     @classmethod
     def get_by_name(cls, name):
+        registry = Nature.registry
+        if registry is not None and registry.company_name == name and registry.company is not None:
+            return registry.company
         return cls.signature(method='getCompany', args=[name])
+
+
+class NatureRegistry(object):
+    """Keeps all the natures of a company in memory, refreshing them every
+    `interval` seconds in a background thread. When a refresh fails, the
+    previously loaded natures keep being served. Typical use, at startup:
+
+        Nature.registry = NatureRegistry('company').start()
+    """
+    def __init__(self, company_name, interval=300):
+        self.company_name = company_name
+        self.interval = interval
+        self.company = None
+        self.natures = {}
+        self.last_refresh = None
+        self.last_error = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def get(self, name):
+        return self.natures.get(name)
+
+    def refresh(self):
+        """Reloads the company natures. Returns `False` if that failed."""
+        try:
+            company = Company.signature(method='getCompany', args=[self.company_name])
+        except Exception as e:
+            self.last_error = e
+            return False
+        self.company = company
+        self.natures = dict((nature.name, nature) for nature in company.natures or [])
+        self.last_refresh = time.time()
+        self.last_error = None
+        return True
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.refresh()
+
+    def start(self):
+        """Loads the natures, then starts refreshing them in the background."""
+        self.refresh()
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='nature-registry')
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._thread = None
@@ -1,10 +1,14 @@
 from barrel import Store
-from barrel.rpc import RpcMixin
+from barrel_reaktor.aio import async_twins, sync_only
 from barrel_reaktor.document.models import Document
+from barrel_reaktor.pagination import iter_items
+from barrel_reaktor.rpc import RpcMixin
 
 
+@async_twins
 class ContentPresentation(Store, RpcMixin):
     interface = 'WSFeaturedContentMgmt'
+    singleflight = ('getContentPresentationDocuments', )
 
     @classmethod
     def get_documents(cls, token, presentation_id, affiliate=None, offset=0, number_of_results=-1, sort=None, direction='asc'):
@@ -12,3 +16,14 @@ class ContentPresentation(Store, RpcMixin):
         return cls.signature(method='getContentPresentationDocuments',
                              args=[token, affiliate, presentation_id, offset, number_of_results, sort, invert],
                              data_converter=Document)
+
+    @classmethod
+    @sync_only
+    def iter_documents(cls, token, presentation_id, affiliate=None, sort=None, direction='asc', chunk_size=100, max_in_flight=2):
+        """Streaming version of `get_documents`, yielding `Document` instances
+        fetched by chunks of `chunk_size`, the next ones in the background.
+        """
+        def fetch(offset, number_of_results):
+            documents = cls.get_documents(token, presentation_id, affiliate, offset, number_of_results, sort, direction) or []
+            return documents, len(documents) == number_of_results
+        return iter_items(fetch, chunk_size, max_in_flight=max_in_flight)
@@ -1,7 +1,9 @@
 from barrel import Store
-from barrel.rpc import RpcMixin
+from barrel_reaktor.aio import async_twins
+from barrel_reaktor.rpc import RpcMixin
 
 
+@async_twins
 class Vote(Store, RpcMixin):
     interface = 'WSDiscussionMgmt'
 
@@ -1 +1,10 @@
 """Abstractions for handling operations with reaktor `Document` object. Mostly `WSDocMgmt` interface."""
+
+
+def normalize_isbn(isbn):
+    """Returns the isbn as a string without dashes nor leading zeros, so that
+    isbns read as numbers and as strings compare equal.
+    """
+    if isbn is None:
+        return None
+    return ('%s' % isbn).strip().replace('-', '').lstrip('0')
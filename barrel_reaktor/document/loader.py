@@ -0,0 +1,118 @@
+import threading
+from holon import ReaktorArgumentError
+from .models import Document
+
+
+class Deferred(object):
+    """Placeholder for a document that is going to be fetched by a `DocumentLoader`."""
+    def __init__(self, loader, doc_id):
+        self.loader = loader
+        self.doc_id = doc_id
+        self._done = threading.Event()
+        self._value = None
+        self._error = None
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self):
+        """Returns the document, dispatching pending lookups if needed, or
+        waiting for the loader window to dispatch them if it has one.
+        Raises `ReaktorArgumentError` if the document does not exist.
+        """
+        if not self._done.is_set():
+            if self.loader.window is None:
+                self.loader.dispatch()
+            self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+    def _resolve(self, value=None, error=None):
+        self._value = value
+        self._error = error
+        self._done.set()
+
+
+class DocumentLoader(object):
+    """Request scoped loader that batches `Document.get_by_id` lookups.
+
+    `load` returns a `Deferred` immediately. All ids queued until the next
+    dispatch are sent as a single `getDocuments` call: without `window`,
+    when the first result is asked for; with it, `window` seconds after the
+    first id has been queued, so that concurrent callers share the call.
+    Ids are only fetched once per loader.
+
+    Either way, a caller asking for one result at a time still makes one
+    round trip per document: `load` all the ids first, then read the
+    results.
+    """
+    def __init__(self, token, window=None, document_class=Document):
+        self.token = token
+        self.window = window
+        self.document_class = document_class
+        self._deferreds = {}
+        self._queue = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def load(self, doc_id):
+        with self._lock:
+            deferred = self._deferreds.get(doc_id)
+            if deferred is None:
+                deferred = self._deferreds[doc_id] = Deferred(self, doc_id)
+                self._queue.append(deferred)
+                if self.window is not None and self._timer is None:
+                    self._timer = threading.Timer(self.window, self.dispatch)
+                    self._timer.daemon = True
+                    self._timer.start()
+        return deferred
+
+    def load_many(self, doc_ids):
+        return [self.load(doc_id) for doc_id in doc_ids]
+
+    def get_by_id(self, doc_id):
+        """Drop-in replacement for `Document.get_by_id`. Only batched with
+        the lookups of other threads, or with ids `load`ed beforehand.
+        """
+        return self.load(doc_id).result()
+
+    def get_by_ids(self, doc_ids):
+        """Same as `Document.get_by_ids`, missing documents are skipped."""
+        deferreds = self.load_many(doc_ids)
+        documents = []
+        for deferred in deferreds:
+            try:
+                documents.append(deferred.result())
+            except ReaktorArgumentError:
+                pass
+        return documents
+
+    def dispatch(self):
+        """Fetches all the queued ids at once."""
+        with self._lock:
+            queue, self._queue = self._queue, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not queue:
+            return
+        error = None
+        try:
+            documents = self.document_class.get_by_ids(self.token, [d.doc_id for d in queue])
+            by_id = dict((document.id, document) for document in documents or [] if document)
+            for deferred in queue:
+                document = by_id.get(deferred.doc_id)
+                if document is None:
+                    deferred._resolve(error=ReaktorArgumentError())
+                else:
+                    deferred._resolve(value=document)
+        except Exception as e:
+            error = e
+        finally:
+            # Also when interrupted by a `BaseException`, e.g. in the timer
+            # thread, so that no caller waits forever.
+            for deferred in queue:
+                if not deferred.done():
+                    deferred._resolve(error=error if error is not None else
+                                      RuntimeError('Lookup of document %s interrupted' % deferred.doc_id))
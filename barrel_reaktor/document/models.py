@@ -1,11 +1,29 @@
+from collections import OrderedDict
 from barrel import Store, Field, BooleanField, DateField, IntField, FloatField, EmbeddedStoreField
-from barrel.rpc import RpcMixin
+from barrel_reaktor.aio import async_twins, sync_only
+from barrel_reaktor.category.models import Category
+from barrel_reaktor.document import normalize_isbn
+from barrel_reaktor.models import memoized_fields
+from barrel_reaktor.pagination import iter_items, map_concurrently
+from barrel_reaktor.rpc import RpcMixin
 from holon import ReaktorArgumentError
 from money import Money
 
 
+@async_twins
+@memoized_fields
 class Document(Store, RpcMixin):
     interface = 'WSDocMgmt'
+    singleflight = ('getDocument', 'getDocuments', 'getDocumentsRelatedToDocument')
+    # Set to a `barrel_reaktor.cache.StoreCache` to cache documents by id.
+    # Keep its default token scope: documents carry the user state.
+    cache = None
+    # Set to a `barrel_reaktor.cache.IsbnIndex` to remember the catalog
+    # document of isbns.
+    isbn_index = None
+    # Set to a `barrel_reaktor.cache.MissingCache` to fail fast on ids and
+    # isbns reaktor recently had no document for.
+    missing = None
 
     class Author(Store):
         first_name = Field(target='firstName')
@@ -142,38 +160,71 @@ class Document(Store, RpcMixin):
     @property
     def categories(self):
         """Builds a list of categories in tree order, from oldest ancestor
-        to the leaf. It relies on both `category_ids` and `_categories`
-        attributes. Note that according to reaktor, when viewing a document
-        from a catalog that is not associated to the token nature,
-        the information is not available.
+        to the leaf, as found in the process wide `Category.index`. The index
+        is fed with the `_categories` attribute. Note that according to
+        reaktor, when viewing a document from a catalog that is not
+        associated to the token nature, the information is not available.
         """
-        if hasattr(self, '_category_trail'):
-            return self._category_trail
-        trail = []
-        if self.category_ids:
-            cats = dict([(c.id, c) for c in self._categories])
-            current = cats.pop(self.category_ids[0], None)
-            trail = [current]
-            while current.parent_id:
-                current = cats.pop(current.parent_id)
-                trail.insert(0, current)
-        self._category_trail = trail
-        return trail
+        if not self.category_ids:
+            return []
+        Category.index.add(self._categories)
+        return list(Category.index.trail(self.category_ids[0]))
 
     @classmethod
     def get_by_id(cls, token, doc_id):
         """Returns `Document` instance for the given id."""
-        document = cls.signature(method='getDocument', args=[token, doc_id])
-        # reaktor call may return `None`
-        # raise a proper exception in this case
-        if not document:
+        cache = cls.cache
+        if cache is not None:
+            key = cache.key(token, doc_id)
+            document = cache.get(key)
+            if document is not None:
+                return document
+        missing = cls.missing
+        if missing is not None and missing.get(token, [doc_id]):
             raise ReaktorArgumentError
+        try:
+            document = cls.signature(method='getDocument', args=[token, doc_id])
+            # reaktor call may return `None`
+            # raise a proper exception in this case
+            if not document:
+                raise ReaktorArgumentError
+        except ReaktorArgumentError:
+            if missing is not None:
+                missing.add(token, [doc_id])
+            raise
+        if cache is not None:
+            cache.set(key, document)
         return document
 
     @classmethod
     def get_by_ids(cls, token, doc_ids):
-        """Returns `Document` instance for the given ids."""
-        return cls.signature(method='getDocuments', args=[token, doc_ids])
+        """Returns `Document` instance for the given ids.
+        When caching is enabled, only the ids missing from the cache are
+        fetched, in a single call, and the order of `doc_ids` is kept.
+        Ids known to `missing` are not fetched again.
+        """
+        cache, missing = cls.cache, cls.missing
+        if cache is None and missing is None:
+            return cls.signature(method='getDocuments', args=[token, doc_ids])
+        found = {}
+        if cache is not None:
+            keys = cache.keys(token, doc_ids)
+            found = dict((keys[k], d) for k, d in cache.get_many(list(keys)).items())
+        unknown = [doc_id for doc_id in OrderedDict.fromkeys(doc_ids) if doc_id not in found]
+        if missing is not None and unknown:
+            gone = missing.get(token, unknown)
+            unknown = [doc_id for doc_id in unknown if doc_id not in gone]
+        if unknown:
+            fetched = {}
+            for document in cls.signature(method='getDocuments', args=[token, unknown]) or []:
+                if document:
+                    fetched[document.id] = document
+            found.update(fetched)
+            if cache is not None:
+                cache.set_many(dict((k, fetched[i]) for k, i in keys.items() if i in fetched))
+            if missing is not None:
+                missing.add(token, [doc_id for doc_id in unknown if doc_id not in fetched])
+        return [found[doc_id] for doc_id in doc_ids if doc_id in found]
 
     @classmethod
     def get_user_doc_id(cls, token, doc_id):
@@ -196,18 +247,101 @@ class Document(Store, RpcMixin):
         """Returns a document by isbn, using search API endpoint since
         fetching doc by isbn requires extra rights.
         """
-        def converter(data):
-            if 'results' in data:
-                return Document(data['results'][0]['searchResult'])
-            # reaktor call may return `None`
-            # raise a proper exception in this case
-            else:
+        index = cls.isbn_index
+        if index is not None:
+            doc_id = index.lookup(token, [isbn]).get(isbn)
+            if doc_id == index.MISSING:
                 raise ReaktorArgumentError
-        args = [token, 'isbn:%s' % isbn, None, 0, 1, None, False, None, None,
-                {'resultType': 'Object'}]
-        return cls.signature(
-            interface="WSSearchDocument", method='searchDocuments',
-            data_converter=converter, args=args)
+            if doc_id is not None:
+                return cls.get_by_id(token, doc_id)
+        query = 'isbn:%s' % isbn
+        missing = cls.missing
+        if missing is not None and missing.get(token, [query]):
+            raise ReaktorArgumentError
+        try:
+            document = cls._match_isbns([isbn], cls._search_isbns(token, [isbn])).get(isbn)
+            if document is None:
+                raise ReaktorArgumentError
+        except ReaktorArgumentError:
+            if missing is not None:
+                missing.add(token, [query])
+            raise
+        if index is not None and document.is_catalog:
+            index.remember(token, {isbn: document.id})
+        return document
+
+    @classmethod
+    def _search_isbns(cls, token, isbns):
+        """Returns all the documents found for the isbns by an OR-combined
+        search, following its pages since an isbn may match several
+        documents (e.g. catalog and user copies).
+        """
+        query = ' OR '.join('isbn:%s' % isbn for isbn in isbns)
+
+        def fetch(offset, number_of_results):
+            def converter(data):
+                data = data or {}
+                results = data.get('results') or []
+                has_more = data.get('hasMore')
+                if has_more is None:
+                    has_more = offset + len(results) < (data.get('totalNumberOfResults') or 0)
+                return [Document(r['searchResult']) for r in results], has_more
+            args = [token, query, None, offset, number_of_results, None, False, None, None,
+                    {'resultType': 'Object'}]
+            return cls.signature(interface="WSSearchDocument", method='searchDocuments',
+                                 data_converter=converter, args=args) or ([], False)
+        # pages leave room for a user copy of each isbn
+        return list(iter_items(fetch, 2 * len(isbns), max_in_flight=1))
+
+    @staticmethod
+    def _match_isbns(isbns, documents):
+        """Returns a dict mapping the isbns to the first of the documents
+        having that isbn, catalog documents first since the other ones are
+        copies of a user.
+        """
+        by_isbn = dict((normalize_isbn(isbn), isbn) for isbn in isbns)
+        matches = {}
+        for document in documents:
+            isbn = by_isbn.get(normalize_isbn(document._isbn))
+            if isbn is None:
+                continue
+            match = matches.get(isbn)
+            if match is None or document.is_catalog and not match.is_catalog:
+                matches[isbn] = document
+        return matches
+
+    @classmethod
+    @sync_only
+    def get_by_isbns(cls, token, isbns, batch_size=50, workers=4):
+        """Returns a dict mapping the given isbns to their document, for the
+        ones that exist. Isbns unknown to `isbn_index` are resolved with
+        OR-combined searches of `batch_size` isbns, `workers` at a time.
+        """
+        isbns = list(isbns)
+        index = cls.isbn_index
+        known = index.lookup(token, isbns) if index is not None else {}
+        doc_ids = dict((isbn, doc_id) for isbn, doc_id in known.items() if doc_id)
+        unknown = [isbn for isbn in OrderedDict.fromkeys(isbns) if isbn not in known]
+        missing = cls.missing
+        if missing is not None and unknown:
+            absent = missing.get(token, ['isbn:%s' % isbn for isbn in unknown])
+            unknown = [isbn for isbn in unknown if 'isbn:%s' % isbn not in absent]
+        batches = [unknown[i:i + batch_size] for i in range(0, len(unknown), batch_size)]
+        results = map_concurrently(lambda batch: cls._search_isbns(token, batch), batches, workers)
+        documents = cls._match_isbns(unknown, (d for result in results for d in result))
+        # The index only gets catalog documents, since it is shared by the
+        # users of a nature while user copies are only found by their owner;
+        # for the same reason, isbns without documents go to `missing`.
+        if index is not None:
+            index.remember(token, dict((isbn, d.id) for isbn, d in documents.items() if d.is_catalog))
+        if missing is not None:
+            missing.add(token, ['isbn:%s' % isbn for isbn in unknown if isbn not in documents])
+        if doc_ids:
+            by_id = dict((d.id, d) for d in cls.get_by_ids(token, list(doc_ids.values())))
+            for isbn, doc_id in doc_ids.items():
+                if doc_id in by_id:
+                    documents[isbn] = by_id[doc_id]
+        return documents
 
     @classmethod
     def get_related_by_id(cls, token, doc_id, offset=0, number_of_results=5):
@@ -217,8 +351,27 @@ class Document(Store, RpcMixin):
 
     @classmethod
     def change_attributes(cls, token, doc_ids, attributes):
-        return cls.signature(method='changeDocumentAttributes',
-                             args=[token, doc_ids, attributes])
+        result = cls.signature(method='changeDocumentAttributes',
+                               args=[token, doc_ids, attributes])
+        if cls.cache is not None:
+            cls.cache.delete_many(list(cls.cache.keys(token, doc_ids)))
+        isbns = [attributes['isbn']] if isinstance(attributes, dict) and attributes.get('isbn') else []
+        cls.forget_missing(token, doc_ids, isbns)
+        return result
+
+    @classmethod
+    @sync_only
+    def forget_missing(cls, token, doc_ids=(), isbns=()):
+        """Drops the given ids and isbns from `missing` (and the isbns from
+        the negative entries of `isbn_index`), to be called once documents
+        have been created or given an isbn.
+        """
+        if cls.missing is not None:
+            cls.missing.discard(token, list(doc_ids) + ['isbn:%s' % isbn for isbn in isbns])
+        if cls.isbn_index is not None and isbns:
+            index = cls.isbn_index
+            index.forget(token, [isbn for isbn, doc_id in index.lookup(token, isbns).items()
+                                 if doc_id == index.MISSING])
 
     @classmethod
     def remove_cover(cls, token, doc_id):
@@ -1,7 +1,16 @@
+from collections import namedtuple
 from barrel import Store, Field, DateField, IntField
-from barrel.rpc import RpcMixin
+from barrel_reaktor.aio import async_twins, sync_only
+from barrel_reaktor.document.models import Document
+from barrel_reaktor.pagination import iter_items, map_concurrently
+from barrel_reaktor.rpc import RpcMixin
+from holon import ReaktorArgumentError
 
 
+Hydration = namedtuple('Hydration', 'documents missing')
+
+
+@async_twins
 class List(Store, RpcMixin):
     interface = 'WSListMgmt'
 
@@ -18,6 +27,12 @@ class List(Store, RpcMixin):
     owner = Field(target='owner')
     total_count = IntField(target='size')
 
+    # Set to a `barrel_reaktor.cache.LRUCache` to remember the last
+    # `(sort, direction)` sent with `changeListSorting`, by `(token, list_id)`,
+    # and skip sending it again. Reaktor keeps the sorting server side, where
+    # other processes and clients can change it: keep the ttl short.
+    sortings = None
+
     @classmethod
     def delete_by_id(cls, token, list_id, delete_documents=False):
         return cls.signature(method='deleteList', args=[token, list_id, delete_documents])
@@ -37,7 +52,20 @@ class List(Store, RpcMixin):
         # That would be nice, but unfortunately, it's not the case.
         # sort = cls.fields[sort].target
         invert = direction == 'desc'
-        return cls.signature(method='changeListSorting', args=[token, list_id, sort, invert])
+        sortings = cls.sortings
+        if sortings is not None:
+            sortings.delete((token, list_id))
+        result = cls.signature(method='changeListSorting', args=[token, list_id, sort, invert])
+        if sortings is not None:
+            sortings.set((token, list_id), (sort, direction))
+        return result
+
+    @classmethod
+    def _sort(cls, token, list_id, sort, direction):
+        """Changes the sorting of the list, unless `sortings` knows it is set."""
+        sortings = cls.sortings
+        if sortings is None or sortings.get((token, list_id)) != (sort, direction):
+            cls._change_sorting(token, list_id, sort, direction)
 
     @classmethod
     def get_by_ids(cls, token, list_ids):
@@ -45,12 +73,39 @@ class List(Store, RpcMixin):
 
     @classmethod
     def filter(cls, token, list_id, search_string=None, offset=0, number_of_results=-1, sort='creationDate', direction='desc'):
-        cls._change_sorting(token, list_id, sort, direction)
+        cls._sort(token, list_id, sort, direction)
         if search_string:
             return cls._get_constrained_by_id(token, list_id, search_string, offset, number_of_results)
         else:
             return cls._get_by_id(token, list_id, offset, number_of_results)
 
+    @classmethod
+    def _iter_chunks(cls, token, get_chunk, chunk_size, max_in_flight, documents):
+        def fetch(offset, number_of_results):
+            chunk = get_chunk(offset, number_of_results)
+            doc_ids = (chunk.document_ids or []) if chunk is not None else []
+            has_more = len(doc_ids) == number_of_results
+            if has_more and chunk.total_count is not None:
+                has_more = offset + len(doc_ids) < chunk.total_count
+            if documents and doc_ids:
+                return Document.get_by_ids(token, doc_ids), has_more
+            return doc_ids, has_more
+        return iter_items(fetch, chunk_size, max_in_flight=max_in_flight)
+
+    @classmethod
+    @sync_only
+    def iter_filter(cls, token, list_id, search_string=None, sort='creationDate', direction='desc', chunk_size=500, max_in_flight=2, documents=False):
+        """Same as `filter`, but yields the document ids of the list (or the
+        `Document` instances if `documents` is set), fetched by chunks of
+        `chunk_size`, the next ones in the background.
+        """
+        cls._sort(token, list_id, sort, direction)
+        if search_string:
+            get_chunk = lambda o, n: cls._get_constrained_by_id(token, list_id, search_string, o, n)
+        else:
+            get_chunk = lambda o, n: cls._get_by_id(token, list_id, o, n)
+        return cls._iter_chunks(token, get_chunk, chunk_size, max_in_flight, documents)
+
     @classmethod
     def get_by_doc_ids(cls, token, document_ids):
         return cls.signature(method='getListsWithDocumentList', args=[token, document_ids], data_converter=lambda d: d)
@@ -67,6 +122,20 @@ class List(Store, RpcMixin):
     def get_trash(cls, token, offset=0, number_of_results=-1):
         return cls._get_by_type(token, 'TRASH', offset, number_of_results)
 
+    @classmethod
+    @sync_only
+    def iter_inbox(cls, token, chunk_size=500, max_in_flight=2, documents=False):
+        """Streaming version of `get_inbox`, see `iter_filter`."""
+        get_chunk = lambda o, n: cls._get_by_type(token, 'INBOX', o, n)
+        return cls._iter_chunks(token, get_chunk, chunk_size, max_in_flight, documents)
+
+    @classmethod
+    @sync_only
+    def iter_trash(cls, token, chunk_size=500, max_in_flight=2, documents=False):
+        """Streaming version of `get_trash`, see `iter_filter`."""
+        get_chunk = lambda o, n: cls._get_by_type(token, 'TRASH', o, n)
+        return cls._iter_chunks(token, get_chunk, chunk_size, max_in_flight, documents)
+
     @classmethod
     def get_user_list_ids(cls, token):
         return cls.signature(method='getListList', args=[token], data_converter=lambda d: d)
@@ -92,6 +161,34 @@ class List(Store, RpcMixin):
         # is still reached.
         return cls.signature(interface='WSDocMgmt', method='removeDocumentsInList', args=[token, list_id, True])
 
+    def hydrate(self, token, batch_size=100, workers=4):
+        """Fetches the documents of `document_ids` in batches of `batch_size`,
+        `workers` batches at a time. Returns a `Hydration` holding the
+        documents in list order and the ids that could not be fetched.
+        """
+        doc_ids = list(self.document_ids or [])
+        batches = [doc_ids[i:i + batch_size] for i in range(0, len(doc_ids), batch_size)]
+
+        def fetch(batch):
+            try:
+                return Document.get_by_ids(token, batch) or []
+            except ReaktorArgumentError:
+                # reaktor rejects the whole batch for a single invalid id:
+                # retry its halves to only lose the invalid ones
+                if len(batch) == 1:
+                    return []
+                middle = len(batch) // 2
+                return fetch(batch[:middle]) + fetch(batch[middle:])
+
+        results = map_concurrently(fetch, batches, workers)
+        found = {}
+        for documents in results:
+            for document in documents:
+                if document:
+                    found[document.id] = document
+        return Hydration([found[i] for i in doc_ids if i in found],
+                         [i for i in doc_ids if i not in found])
+
     @property
     def is_inbox(self):
         return self.name.startswith('INBOX-')
@@ -0,0 +1,183 @@
+"""Per method instrumentation of the reaktor calls made by the models.
+
+Instrumentation is off until a `Registry` is installed:
+
+    instrumentation.registry = Registry(sample_rate=0.1, exporter=push_to_statsd)
+
+From then on, every `signature` call records its latency, errors, the time
+spent in its data converter and, if `measure_payloads` is set, estimated
+request and response sizes (computed by encoding the arguments and the
+response to JSON, which has a cost of its own). Converters wrapped with
+`timed` are measured wherever they are called, e.g. lazily decoded
+embedded stores such as basket items.
+"""
+import functools
+import json
+import random
+import threading
+import time
+
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1 << 10, 1 << 12, 1 << 14, 1 << 16, 1 << 18, 1 << 20, 1 << 22)
+
+# The active `Registry`, `None` disables instrumentation.
+registry = None
+
+
+class Histogram(object):
+    """Cumulative histogram over fixed bucket upper bounds."""
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        index = 0
+        for bound in self.buckets:
+            if value <= bound:
+                break
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        return {'buckets': list(self.buckets), 'counts': list(self.counts),
+                'count': self.count, 'sum': self.sum}
+
+
+class MethodStats(object):
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latency = Histogram()
+        self.decode = Histogram()
+        self.request_bytes = Histogram(SIZE_BUCKETS)
+        self.response_bytes = Histogram(SIZE_BUCKETS)
+
+    def snapshot(self):
+        return {'calls': self.calls, 'errors': self.errors,
+                'latency': self.latency.snapshot(), 'decode': self.decode.snapshot(),
+                'request_bytes': self.request_bytes.snapshot(),
+                'response_bytes': self.response_bytes.snapshot()}
+
+
+class Registry(object):
+    """In process store of the collected metrics.
+    `exporter` is called with `snapshot()` on `export`.
+    """
+    def __init__(self, sample_rate=1.0, measure_payloads=False, exporter=None):
+        self.sample_rate = sample_rate
+        self.measure_payloads = measure_payloads
+        self.exporter = exporter
+        self.methods = {}
+        self.converters = {}
+        self._lock = threading.Lock()
+
+    def sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def record_call(self, interface, method, latency, decode, error=False,
+                    request_bytes=None, response_bytes=None):
+        with self._lock:
+            stats = self.methods.get((interface, method))
+            if stats is None:
+                stats = self.methods[(interface, method)] = MethodStats()
+            stats.calls += 1
+            stats.latency.observe(latency)
+            stats.decode.observe(decode)
+            if error:
+                stats.errors += 1
+            if request_bytes is not None:
+                stats.request_bytes.observe(request_bytes)
+            if response_bytes is not None:
+                stats.response_bytes.observe(response_bytes)
+
+    def record_converter(self, name, duration):
+        with self._lock:
+            histogram = self.converters.get(name)
+            if histogram is None:
+                histogram = self.converters[name] = Histogram()
+            histogram.observe(duration)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'methods': dict(('%s.%s' % key, stats.snapshot()) for key, stats in self.methods.items()),
+                'converters': dict((name, h.snapshot()) for name, h in self.converters.items()),
+            }
+
+    def export(self):
+        if self.exporter is not None:
+            self.exporter(self.snapshot())
+
+    def reset(self):
+        with self._lock:
+            self.methods = {}
+            self.converters = {}
+
+
+def _size(data):
+    try:
+        return len(json.dumps(data, default=repr))
+    except (TypeError, ValueError):
+        return None
+
+
+def _name(converter):
+    return getattr(converter, '__name__', None) or type(converter).__name__
+
+
+def timed(converter):
+    """Wraps a data converter so that the time spent in it is recorded."""
+    name = _name(converter)
+
+    @functools.wraps(converter)
+    def wrapper(*args, **kwargs):
+        current = registry
+        if current is None:
+            return converter(*args, **kwargs)
+        start = time.time()
+        try:
+            return converter(*args, **kwargs)
+        finally:
+            current.record_converter(name, time.time() - start)
+    return wrapper
+
+
+def call(signature, interface, method, data_converter, args):
+    """Runs `signature` with the given arguments, recording metrics if
+    instrumentation is enabled and the call is sampled.
+    """
+    current = registry
+    if current is None or not current.sampled():
+        return signature(interface=interface, method=method, data_converter=data_converter, args=args)
+    name = _name(data_converter)
+    decode = [0, None]
+
+    def converter(*converter_args, **kwargs):
+        if current.measure_payloads and converter_args:
+            size = _size(converter_args[0])
+            if size is not None:
+                decode[1] = (decode[1] or 0) + size
+        start = time.time()
+        try:
+            return data_converter(*converter_args, **kwargs)
+        finally:
+            decode[0] += time.time() - start
+
+    request_bytes = _size(args) if current.measure_payloads else None
+    error = False
+    start = time.time()
+    try:
+        return signature(interface=interface, method=method, data_converter=converter, args=args)
+    except Exception:
+        error = True
+        raise
+    finally:
+        current.record_call(interface, method, time.time() - start, decode[0], error,
+                            request_bytes, decode[1])
+        if decode[0]:
+            current.record_converter(name, decode[0])
@@ -1,7 +1,91 @@
-from barrel import Store, Field, FloatField
+from barrel import Store, EmbeddedStoreField, Field, FloatField
 
 
 class Price(Store):
     """Helper class to use with the new reaktor price fields."""
     amount = FloatField(target='amount')
     currency = Field(target='currency')
+
+
+def memo_of(instance):
+    """Returns the dict holding the memoized values of the instance."""
+    try:
+        return instance.__dict__['_memo']
+    except KeyError:
+        memo = instance.__dict__['_memo'] = {}
+        return memo
+
+
+def clear_memo(instance):
+    """Forgets all the memoized values of the instance."""
+    instance.__dict__.pop('_memo', None)
+
+
+class memoized_property(object):
+    """Read only property computed once per instance and kept in its memo."""
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        memo = memo_of(instance)
+        value = memo.get(self.name, _missing)
+        if value is _missing:
+            value = memo[self.name] = self.func(instance)
+        return value
+
+
+class MemoMixin(object):
+    """Drops the memoized values of the instance whenever one of its
+    attributes is set.
+    """
+    def __setattr__(self, name, value):
+        clear_memo(self)
+        super(MemoMixin, self).__setattr__(name, value)
+
+    def invalidate(self):
+        clear_memo(self)
+
+
+class MemoizedField(object):
+    """Wraps a barrel embedded store field so that its stores are built
+    from the reaktor data the first time it is read, and only once per
+    instance.
+    """
+    def __init__(self, name, field):
+        self.name = name
+        self.field = field
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self.field
+        memo = memo_of(instance)
+        value = memo.get(self.name, _missing)
+        if value is _missing:
+            value = memo[self.name] = self.field.__get__(instance, owner)
+        return value
+
+    def __set__(self, instance, value):
+        memo = memo_of(instance)
+        if hasattr(self.field, '__set__'):
+            memo.pop(self.name, None)
+            self.field.__set__(instance, value)
+        else:
+            memo[self.name] = value
+
+
+def memoized_fields(cls):
+    """Class decorator memoizing the embedded stores of the store. Other
+    fields are left alone: barrel decodes them on access, which is cheaper
+    than going through the memo.
+    """
+    for name, attr in list(vars(cls).items()):
+        if isinstance(attr, EmbeddedStoreField):
+            setattr(cls, name, MemoizedField(name, attr))
+    return cls
+
+
+_missing = object()
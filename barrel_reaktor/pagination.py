@@ -0,0 +1,68 @@
+"""Helpers to walk through paginated reaktor calls with bounded memory, and
+to run batches of calls concurrently.
+"""
+from collections import deque
+from multiprocessing.pool import ThreadPool
+
+
+class _Ready(object):
+    """Synchronous stand-in for `AsyncResult`."""
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+
+    def get(self):
+        return self.func(*self.args)
+
+
+def iter_pages(fetch, page_size, offset=0, limit=None, max_in_flight=2):
+    """Yields pages of items, where `fetch(offset, number_of_results)` returns
+    an `(items, has_more)` tuple for one page.
+
+    At most `max_in_flight` pages are requested at once: while a page is
+    consumed, the following ones are fetched in background threads, so
+    memory stays bounded by `max_in_flight` pages. `limit` caps the total
+    number of items.
+    """
+    pool = ThreadPool(max_in_flight) if max_in_flight > 1 else None
+    pending = deque()
+    end = None if limit is None else offset + limit
+    try:
+        while True:
+            while len(pending) < max_in_flight and (end is None or offset < end):
+                number_of_results = page_size if end is None else min(page_size, end - offset)
+                args = (offset, number_of_results)
+                pending.append(pool.apply_async(fetch, args) if pool else _Ready(fetch, args))
+                offset += number_of_results
+            if not pending:
+                return
+            items, has_more = pending.popleft().get()
+            if items:
+                yield items
+            if not items or not has_more:
+                return
+    finally:
+        if pool is not None:
+            # Let already requested pages complete in the background.
+            pool.close()
+
+
+def iter_items(fetch, page_size, offset=0, limit=None, max_in_flight=2):
+    """Same as `iter_pages`, but yields the items one by one."""
+    for items in iter_pages(fetch, page_size, offset, limit, max_in_flight):
+        for item in items:
+            yield item
+
+
+def map_concurrently(func, items, workers):
+    """Returns `[func(item) for item in items]`, with up to `workers` calls
+    running at once in a thread pool when there are several items.
+    """
+    items = list(items)
+    if len(items) < 2 or workers < 2:
+        return [func(item) for item in items]
+    pool = ThreadPool(min(workers, len(items)))
+    try:
+        return pool.map(func, items)
+    finally:
+        pool.close()
@@ -0,0 +1,64 @@
+"""Runs several independent model calls at once.
+
+    with Pipeline() as pipeline:
+        user = pipeline.add(User.get_by_token, token)
+        basket = pipeline.add(Basket.get_by_token, token)
+        wishlist = pipeline.add(Wishlist.get_by_token, token)
+    user.result(), basket.result()
+
+Calls go through the regular model methods, so each result is converted as
+usual, and a failing call only affects its own `result()`. Since barrel
+sends one request per call, they are run concurrently rather than batched:
+the pipeline takes as long as its slowest call.
+"""
+from barrel_reaktor.pagination import map_concurrently
+
+
+class Call(object):
+    """A queued call, holding its outcome once the pipeline has run."""
+    def __init__(self, func, args, kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.done = False
+        self.value = None
+        self.error = None
+
+    def run(self):
+        try:
+            self.value = self.func(*self.args, **self.kwargs)
+        except Exception as e:
+            self.error = e
+        self.done = True
+        return self
+
+    def result(self):
+        """Returns the value of the call, or raises its exception."""
+        if not self.done:
+            raise RuntimeError('The pipeline has not been executed yet.')
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class Pipeline(object):
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+        self.calls = []
+
+    def add(self, func, *args, **kwargs):
+        call = Call(func, args, kwargs)
+        self.calls.append(call)
+        return call
+
+    def execute(self):
+        """Runs all pending calls concurrently and returns them."""
+        map_concurrently(Call.run, [c for c in self.calls if not c.done], self.max_workers)
+        return self.calls
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
@@ -0,0 +1,236 @@
+"""Hedged requests, per call deadlines and per interface circuit breakers.
+
+Off until a `Policy` is installed:
+
+    resilience.policy = Policy(deadline=2.0)
+
+From then on, every reaktor call goes through the circuit breaker of its
+interface, which rejects calls with `CircuitOpenError` for `reset_timeout`
+seconds after `failure_threshold` consecutive failures, then lets a single
+probe call through. Calls to the `hedged` methods, which must be idempotent,
+get a duplicate request when the first one is slower than the recent 95th
+percentile of that method; the first response wins. Calls taking longer than
+`deadline` seconds raise `DeadlineExceeded`.
+"""
+import threading
+import time
+
+try:
+    from Queue import Queue, Empty
+except ImportError:  # python 3
+    from queue import Queue, Empty
+
+from holon import ReaktorArgumentError
+
+
+HEDGED = ('getDocument', 'getDocuments', 'searchDocuments', 'getSuggestionObjects',
+          'getSuggestionObjectsWithHighlights', 'getContentCategory', 'getList')
+
+# The active `Policy`, `None` disables hedging, deadlines and breakers.
+policy = None
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an interface whose circuit is open."""
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a call does not complete within its deadline."""
+
+
+class LatencyTracker(object):
+    """Keeps the last `size` latencies to compute percentiles."""
+    def __init__(self, size=200):
+        self.size = size
+        self.samples = []
+        self._index = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.samples)
+
+    def add(self, latency):
+        with self._lock:
+            if len(self.samples) < self.size:
+                self.samples.append(latency)
+            else:
+                self.samples[self._index] = latency
+                self._index = (self._index + 1) % self.size
+
+    def percentile(self, ratio):
+        with self._lock:
+            samples = sorted(self.samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * ratio))]
+
+
+class CircuitBreaker(object):
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.metrics = {'calls': 0, 'failures': 0, 'rejected': 0, 'trips': 0}
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Raises `CircuitOpenError` if the call must not be made."""
+        with self._lock:
+            if self.state == self.OPEN and time.time() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.OPEN or (self.state == self.HALF_OPEN and self._probing):
+                self.metrics['rejected'] += 1
+                raise CircuitOpenError()
+            if self.state == self.HALF_OPEN:
+                self._probing = True
+            self.metrics['calls'] += 1
+
+    def success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self.metrics['failures'] += 1
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.metrics['trips'] += 1
+                self.state = self.OPEN
+                self.opened_at = time.time()
+
+
+class Policy(object):
+    """`ignored` exceptions are reaktor answers rather than failures, and
+    neither trip breakers nor stop hedging. Hedging starts once `min_samples`
+    latencies of a method are known, and never waits less than `min_delay`.
+    """
+    def __init__(self, deadline=None, hedged=HEDGED, quantile=0.95, min_delay=0.01, min_samples=20,
+                 failure_threshold=5, reset_timeout=30, ignored=(ReaktorArgumentError, )):
+        self.deadline = deadline
+        self.hedged = frozenset(hedged)
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.ignored = ignored
+        self.breakers = {}
+        self.latencies = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, interface):
+        with self._lock:
+            breaker = self.breakers.get(interface)
+            if breaker is None:
+                breaker = self.breakers[interface] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return breaker
+
+    def _tracker(self, key):
+        with self._lock:
+            tracker = self.latencies.get(key)
+            if tracker is None:
+                tracker = self.latencies[key] = LatencyTracker()
+            return tracker
+
+    def _count(self, interface, name):
+        with self._lock:
+            counters = self.counters.setdefault(interface, {'hedges': 0, 'hedge_wins': 0, 'timeouts': 0})
+            counters[name] += 1
+
+    def hedge_delay(self, tracker):
+        if len(tracker) < self.min_samples:
+            return None
+        return max(self.min_delay, tracker.percentile(self.quantile))
+
+    def call(self, interface, method, func):
+        breaker = self.breaker(interface)
+        breaker.allow()
+        tracker = self._tracker((interface, method))
+        delay = self.hedge_delay(tracker) if method in self.hedged else None
+        start = time.time()
+        try:
+            if delay is None and self.deadline is None:
+                value = func()
+            else:
+                value = self._race(interface, func, delay)
+        except self.ignored:
+            breaker.success()
+            raise
+        except CircuitOpenError:
+            raise
+        except Exception:
+            breaker.failure()
+            raise
+        breaker.success()
+        tracker.add(time.time() - start)
+        return value
+
+    def _race(self, interface, func, delay):
+        """Runs `func` in a thread, and once more if it takes longer than
+        `delay`; returns the first result. Slower attempts are left to
+        complete in the background.
+        """
+        results = Queue()
+
+        def attempt(index):
+            try:
+                results.put((index, True, func()))
+            except Exception as e:
+                results.put((index, False, e))
+
+        def launch(index):
+            thread = threading.Thread(target=attempt, args=(index, ))
+            thread.daemon = True
+            thread.start()
+
+        now = time.time()
+        hedge_at = None if delay is None else now + delay
+        end = None if self.deadline is None else now + self.deadline
+        launch(0)
+        running = 1
+        while True:
+            timeouts = [t - time.time() for t in (hedge_at, end) if t is not None]
+            try:
+                index, ok, value = results.get(timeout=max(0, min(timeouts)) if timeouts else None)
+            except Empty:
+                if hedge_at is not None and time.time() >= hedge_at:
+                    hedge_at = None
+                    launch(1)
+                    running += 1
+                    self._count(interface, 'hedges')
+                elif end is not None and time.time() >= end:
+                    self._count(interface, 'timeouts')
+                    raise DeadlineExceeded()
+                continue
+            running -= 1
+            if ok:
+                if index:
+                    self._count(interface, 'hedge_wins')
+                return value
+            if not running:
+                raise value
+
+    def metrics(self):
+        """Returns breaker states and counters, by interface."""
+        with self._lock:
+            breakers = dict(self.breakers)
+            counters = dict((k, dict(v)) for k, v in self.counters.items())
+            latencies = dict(self.latencies)
+        metrics = {}
+        for interface, breaker in breakers.items():
+            metrics[interface] = dict(breaker.metrics, state=breaker.state)
+        for interface, values in counters.items():
+            metrics.setdefault(interface, {}).update(values)
+        for (interface, method), tracker in latencies.items():
+            metrics.setdefault(interface, {}).setdefault('p95', {})[method] = tracker.percentile(0.95)
+        return metrics
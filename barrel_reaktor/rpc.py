@@ -0,0 +1,37 @@
+"""`RpcMixin` used by all the reaktor models: barrel's one, with hooks around
+every `signature` call. While an asyncio twin is replayed (see
+`barrel_reaktor.aio`), calls are answered by the replay instead.
+"""
+from barrel.rpc import RpcMixin as BaseRpcMixin
+from barrel_reaktor import aio, instrumentation, resilience
+from barrel_reaktor.singleflight import Group
+
+
+flights = Group()
+
+
+class RpcMixin(BaseRpcMixin):
+    # Reaktor methods for which identical concurrent calls share one request.
+    # Only list read methods here: mutating calls must never be collapsed.
+    singleflight = ()
+
+    @classmethod
+    def signature(cls, interface=None, method=None, data_converter=None, args=None):
+        base = super(RpcMixin, cls).signature
+        interface = interface or cls.interface
+        data_converter = data_converter or cls
+        replay = aio.replaying()
+        if replay is not None:
+            return replay.signature(interface, method, data_converter, args)
+
+        def send():
+            return instrumentation.call(base, interface, method, data_converter, args)
+
+        def call():
+            policy = resilience.policy
+            if policy is None:
+                return send()
+            return policy.call(interface, method, send)
+        if method in cls.singleflight:
+            return flights.do(flights.key(interface, method, data_converter, args), call)
+        return call()
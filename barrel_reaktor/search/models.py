@@ -1,6 +1,11 @@
+import json
 from barrel import Store, Field, FloatField, EmbeddedStoreField
-from barrel.rpc import RpcMixin
+from barrel_reaktor.aio import async_twins, sync_only
+from barrel_reaktor.cache import LRUCache, token_scope
 from barrel_reaktor.document.models import Document
+from barrel_reaktor.models import memo_of, memoized_fields
+from barrel_reaktor.pagination import iter_items
+from barrel_reaktor.rpc import RpcMixin
 from . import get_search_sources
 
 
@@ -23,6 +28,7 @@ class CategoryStat(Store):
     label = Field(target="name")
 
 
+@memoized_fields
 class DocumentResult(Store):
     """Search result object wrapping search itemsalongside search info
     like pagination information.
@@ -60,12 +66,64 @@ class DocumentResult(Store):
     total_count = Field(target="totalNumberOfResults")
 
 
+class SearchCache(object):
+    """Cache for `Search.documents` results.
+
+    Queries differing only by spacing or casing share entries. Since facets
+    don't depend on the requested page, all cached pages of a query share a
+    single `DocumentResult.Stats` instance. Results are scoped by token,
+    catalog searches included, since the documents they embed carry the
+    state of the user.
+    """
+    OPERATORS = ('AND', 'OR', 'NOT', 'TO')
+
+    def __init__(self, max_size=1000, ttl=60, scope=token_scope):
+        self.pages = LRUCache(max_size=max_size, ttl=ttl)
+        self.stats = LRUCache(max_size=max_size, ttl=ttl)
+        self.scope = scope
+
+    @classmethod
+    def normalize(cls, search_string):
+        """Collapses whitespace and lowercases terms, leaving boolean
+        operators and field names untouched.
+        """
+        terms = []
+        for term in (search_string or '').split():
+            if term not in cls.OPERATORS:
+                field, sep, value = term.rpartition(':')
+                term = field + sep + value.lower()
+            terms.append(term)
+        return ' '.join(terms)
+
+    def query_key(self, token, search_string, sources, sort, direction, include_search_fields, related, options):
+        return (self.scope(token), self.normalize(search_string), tuple(sources or ()), sort, direction == 'desc',
+                json.dumps([include_search_fields, related, options], sort_keys=True, default=repr))
+
+    def get(self, query, offset, number_of_results):
+        return self.pages.get(query + (offset, number_of_results))
+
+    def set(self, query, offset, number_of_results, result):
+        stats = self.stats.get(query)
+        if stats is None:
+            if result.stats is not None:
+                self.stats.set(query, result.stats)
+        else:
+            memo_of(result)['stats'] = stats
+        self.pages.set(query + (offset, number_of_results), result)
+
+
+@async_twins
 class Search(RpcMixin):
     """Interface to various API search endpoints. Beware that this one is not
     a `Store`, which means that when calling its class methods,
     expect different types.
     """
     interface = 'WSSearchDocument'
+    # Set to a `SearchCache` to cache search results.
+    cache = None
+    # Set to a `barrel_reaktor.search.stream.JsonRpcOpener` (or any callable
+    # returning the raw response of a call) to enable `stream_documents`.
+    opener = None
 
     @classmethod
     def documents(cls, token, search_string, offset, number_of_results, sort=None, direction=None, include_search_fields=None, source=None, related=None, options=None):
@@ -73,10 +131,57 @@ class Search(RpcMixin):
         invert = direction == 'desc'
         if not options:
             options = {'resultType': 'Object'}
-        if source:
-            sources = get_search_sources(source)
-        return cls.signature(method='searchDocuments', data_converter=DocumentResult,
+        sources = get_search_sources(source) if source else None
+        cache = cls.cache
+        if cache is not None:
+            query = cache.query_key(token, search_string, sources, sort, direction, include_search_fields, related, options)
+            result = cache.get(query, offset, number_of_results)
+            if result is not None:
+                return result
+        result = cls.signature(method='searchDocuments', data_converter=DocumentResult,
             args=[token, search_string, sources, offset, number_of_results, sort, invert, related, include_search_fields, options])
+        if cache is not None and result is not None:
+            cache.set(query, offset, number_of_results, result)
+        return result
+
+    @classmethod
+    @sync_only
+    def stream_documents(cls, token, search_string, offset, number_of_results, sort=None, direction=None, include_search_fields=None, source=None, related=None, options=None, skip_stats=False):
+        """Same as `documents`, but returns a `SearchStream` yielding the items
+        while the response is being received; `stream.result` holds the rest
+        of the result once the items have been consumed. Without `opener`,
+        the result is fetched with `documents` and wrapped.
+        Calls made through `opener` bypass `cache`, instrumentation and the
+        resilience policy, which only apply to `signature` calls.
+        """
+        from .stream import SearchStream
+        if cls.opener is None:
+            return SearchStream.wrap(cls.documents(token, search_string, offset, number_of_results, sort, direction,
+                                                   include_search_fields, source, related, options))
+        invert = direction == 'desc'
+        if not options:
+            options = {'resultType': 'Object'}
+        sources = get_search_sources(source) if source else None
+        response = cls.opener(cls.interface, 'searchDocuments',
+            [token, search_string, sources, offset, number_of_results, sort, invert, related, include_search_fields, options])
+        return SearchStream(response, skip_stats=skip_stats)
+
+    @classmethod
+    @sync_only
+    def iter_documents(cls, token, search_string, page_size=100, max_in_flight=2, offset=0, limit=None, **kwargs):
+        """Yields `DocumentResult.DocumentItem` objects for a given string,
+        across as many pages of `page_size` results as needed. The next pages
+        are fetched in the background, `max_in_flight` at most.
+        Other keyword arguments are passed to `documents`.
+        """
+        def fetch(offset, number_of_results):
+            result = cls.documents(token, search_string, offset, number_of_results, **kwargs)
+            items = result.items or []
+            has_more = result.has_more
+            if has_more is None:
+                has_more = offset + len(items) < (result.total_count or 0)
+            return items, has_more
+        return iter_items(fetch, page_size, offset=offset, limit=limit, max_in_flight=max_in_flight)
 
     @classmethod
     def suggestions(cls, token, search_string, number_of_results, sources=None, highlight=None):
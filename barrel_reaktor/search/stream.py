@@ -0,0 +1,217 @@
+"""Incremental decoding of `searchDocuments` responses.
+
+`SearchStream` reads a JSON-RPC response from a file-like object and yields
+`DocumentResult.DocumentItem` objects as soon as each element of `results`
+has been received, without holding the whole response in memory. Facets
+(`relatedObjects`) are decoded separately, or skipped with `skip_stats`.
+"""
+import codecs
+import json
+import re
+
+try:
+    from urllib.request import Request, urlopen
+except ImportError:  # python 2
+    from urllib2 import Request, urlopen
+
+from barrel_reaktor import RpcError
+from .models import DocumentResult
+
+
+WHITESPACE = ' \t\n\r'
+STRING_END = re.compile(r'(?:[^"\\]|\\.)*"', re.DOTALL)
+SPECIAL = re.compile(r'["\[\]{}]')
+
+
+class JsonRpcOpener(object):
+    """Posts JSON-RPC calls to `url` and returns the unread HTTP response."""
+    def __init__(self, url, timeout=30):
+        self.url = url
+        self.timeout = timeout
+
+    def __call__(self, interface, method, args):
+        body = json.dumps({'id': 1, 'method': '%s.%s' % (interface, method), 'params': args})
+        request = Request(self.url, body.encode('utf-8'), {'Content-Type': 'application/json'})
+        return urlopen(request, timeout=self.timeout)
+
+
+class _Reader(object):
+    """Pull parser over a text buffer that is refilled from `fp` on demand.
+    Consumed text is dropped, so the buffer only holds the current value.
+    """
+    def __init__(self, fp, chunk_size):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.json = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.mark = None
+        self.eof = False
+
+    def fill(self):
+        if self.eof:
+            raise ValueError('Unexpected end of search response')
+        keep = self.pos if self.mark is None else self.mark
+        if keep:
+            self.buf = self.buf[keep:]
+            self.pos -= keep
+            if self.mark is not None:
+                self.mark = 0
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            self.buf += self.decoder.decode(b'', True)
+        else:
+            self.buf += self.decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            self.fill()
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars:
+            raise ValueError('Unexpected %r in search response' % char)
+        self.pos += 1
+        return char
+
+    def decode(self):
+        """Decodes the next value."""
+        if self.peek() in '[{':
+            # find the end of the value first, so that it's only parsed once
+            self.mark = self.pos
+            try:
+                self.skip()
+                return json.loads(self.buf[self.mark:self.pos])
+            finally:
+                self.mark = None
+        while True:
+            try:
+                value, end = self.json.raw_decode(self.buf, self.pos)
+            except ValueError:
+                self.fill()
+                continue
+            # a number may go on in the next chunk
+            if end == len(self.buf) and not self.eof:
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+    def skip(self):
+        """Skips the next value without decoding it."""
+        if self.peek() not in '[{':
+            self.decode()
+            return
+        depth = 0
+        while True:
+            match = SPECIAL.search(self.buf, self.pos)
+            if match is None:
+                self.pos = len(self.buf)
+                self.fill()
+                continue
+            char = match.group()
+            if char == '"':
+                end = STRING_END.match(self.buf, match.end())
+                if end is None:
+                    self.pos = match.start()
+                    self.fill()
+                    continue
+                self.pos = end.end()
+                continue
+            self.pos = match.end()
+            depth += 1 if char in '[{' else -1
+            if depth == 0:
+                return
+
+    def members(self):
+        """Iterates over the keys of an object; the caller must consume each value."""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.decode()
+            self.expect(':')
+            yield key
+            if self.expect(',}') == '}':
+                return
+
+
+class SearchStream(object):
+    """Iterable over the items of a `searchDocuments` response read from
+    `fp`. Once it is exhausted, `result` holds a `DocumentResult` with all
+    the other fields (without stats when `skip_stats` is set). `envelope`
+    tells whether the result is wrapped in a JSON-RPC response. `fp` is
+    closed once the stream is exhausted, fails, or is closed.
+    """
+    def __init__(self, fp, skip_stats=False, envelope=True, chunk_size=16384):
+        self.reader = _Reader(fp, chunk_size)
+        self.skip_stats = skip_stats
+        self.envelope = envelope
+        self.result = None
+        self._items = None
+
+    @classmethod
+    def wrap(cls, result):
+        """Stream over an already decoded `DocumentResult`."""
+        stream = cls(None)
+        stream.result = result
+        stream._items = iter(result.items or []) if result is not None else iter(())
+        return stream
+
+    def __iter__(self):
+        if self._items is None:
+            self._items = self._decode()
+        return self._items
+
+    def close(self):
+        """Closes the response, e.g. the socket of an HTTP response."""
+        close = getattr(self.reader.fp, 'close', None)
+        if close is not None:
+            close()
+
+    def _decode(self):
+        reader = self.reader
+        try:
+            if not self.envelope:
+                for item in self._result():
+                    yield item
+                return
+            error = None
+            for key in reader.members():
+                if key == 'result' and reader.peek() != 'n':
+                    for item in self._result():
+                        yield item
+                elif key == 'error':
+                    error = reader.decode()
+                else:
+                    reader.skip()
+            if error:
+                raise RpcError(error)
+        finally:
+            self.close()
+
+    def _result(self):
+        reader = self.reader
+        data = {}
+        for key in reader.members():
+            if key == 'results':
+                reader.expect('[')
+                if reader.peek() == ']':
+                    reader.pos += 1
+                    continue
+                while True:
+                    yield DocumentResult.DocumentItem(reader.decode())
+                    if reader.expect(',]') == ']':
+                        break
+            elif key == 'relatedObjects' and self.skip_stats:
+                reader.skip()
+            else:
+                data[key] = reader.decode()
+        self.result = DocumentResult(data)
@@ -1,6 +1,12 @@
+import threading
 from barrel import Store, DateField, EmbeddedStoreField, Field, FloatField, LongIntField, BooleanField
-from barrel.rpc import RpcMixin
+from barrel_reaktor.aio import async_twins
+from barrel_reaktor.cache import LRUCache
+from barrel_reaktor.document import normalize_isbn
 from barrel_reaktor.document.models import Document
+from barrel_reaktor.instrumentation import timed
+from barrel_reaktor.models import MemoMixin, memoized_property
+from barrel_reaktor.rpc import RpcMixin
 from money import Money
 
 
@@ -40,6 +46,7 @@ class StateNotification(Notification):
     new_state = Field(target='newState')
 
 
+@timed
 def notification_factory(data=None):
     """Notification factory to get properly typed notifications."""
     if data is None:
@@ -52,8 +59,10 @@ def notification_factory(data=None):
         return StateNotification(data)
     else:
         raise ValueError('Notification type not supported: %s' % notification_type)
+notification_factory.store_classes = (Notification, PriceNotification, StateNotification)
 
 
+@async_twins
 class ShoppingListItem(Store, RpcMixin):
     interface = 'WSShopMgmt'
 
@@ -70,18 +79,26 @@ class ShoppingListItem(Store, RpcMixin):
         raise NotImplementedError()
 
 
+@async_twins
 class WishlistItem(ShoppingListItem):
     @classmethod
     def add_to_list(cls, token, doc_id):
         """Adds a document to the user wishlist."""
-        return cls.signature(method='addDocumentToCommercialWishList', args=[token, doc_id])
+        result = cls.signature(method='addDocumentToCommercialWishList', args=[token, doc_id])
+        if Wishlist.membership is not None:
+            Wishlist.membership.add(token, doc_id)
+        return result
 
     @classmethod
     def remove_from_list(cls, token, doc_id):
         """Removes a document from the user wishlist."""
-        return cls.signature(method='removeDocumentFromCommercialWishList', args=[token, doc_id])
+        result = cls.signature(method='removeDocumentFromCommercialWishList', args=[token, doc_id])
+        if Wishlist.membership is not None:
+            Wishlist.membership.discard(token, doc_id)
+        return result
 
 
+@async_twins
 class PreorderlistItem(ShoppingListItem):
     pre_paid = BooleanField(target='prePaid')
 
@@ -95,10 +112,85 @@ class PreorderlistItem(ShoppingListItem):
     @classmethod
     def remove_from_list(cls, token, doc_id):
         """Preorder logic for removing item from a list."""
-        return cls.signature(method='removeDocumentFromPreOrderList', args=[token, doc_id])
+        result = cls.signature(method='removeDocumentFromPreOrderList', args=[token, doc_id])
+        if Preorderlist.membership is not None:
+            Preorderlist.membership.discard(token, doc_id)
+        return result
+
+
+def document_ids_of(shopping_list):
+    """Returns a frozenset with the ids of the documents in the list."""
+    if shopping_list is None:
+        return frozenset()
+    return frozenset(item.document.id for item in shopping_list.items or [])
+
+
+class Membership(object):
+    """Token keyed cache of the ids of the documents in a shopping list.
+    Entries expire after `ttl` seconds and are updated on the writes made
+    through this process only: lists changed by another process or client
+    stay stale until then, so keep the ttl short.
+    """
+    def __init__(self, max_size=10000, ttl=60):
+        self.cache = LRUCache(max_size=max_size, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        """Returns a frozenset of document ids, `None` if unknown."""
+        return self.cache.get(token)
+
+    def remember(self, token, shopping_list):
+        doc_ids = document_ids_of(shopping_list)
+        self.cache.set(token, doc_ids)
+        return doc_ids
+
+    def add(self, token, doc_id):
+        with self._lock:
+            doc_ids = self.cache.get(token)
+            if doc_ids is not None:
+                self.cache.set(token, doc_ids | frozenset([doc_id]))
+
+    def discard(self, token, doc_id):
+        with self._lock:
+            doc_ids = self.cache.get(token)
+            if doc_ids is not None:
+                self.cache.set(token, doc_ids - frozenset([doc_id]))
+
+    def invalidate(self, token):
+        self.cache.delete(token)
+
+
+@async_twins
+class MembershipMixin(object):
+    """Document membership checks for shopping lists. The list is fetched for
+    every check, unless `membership` is set to a `Membership`.
+    """
+    membership = None
 
+    @classmethod
+    def document_ids(cls, token):
+        """Returns a frozenset with the ids of the documents in the list."""
+        membership = cls.membership
+        if membership is None:
+            return document_ids_of(cls.get_by_token(token))
+        doc_ids = membership.get(token)
+        if doc_ids is None:
+            doc_ids = membership.remember(token, cls.get_by_token(token))
+        return doc_ids
+
+    @classmethod
+    def contains(cls, token, doc_id):
+        return doc_id in cls.document_ids(token)
 
-class Wishlist(Store, RpcMixin):
+    @classmethod
+    def contains_many(cls, token, doc_ids):
+        """Returns a dict telling for each given id if the document is in the list."""
+        in_list = cls.document_ids(token)
+        return dict((doc_id, doc_id in in_list) for doc_id in doc_ids)
+
+
+@async_twins
+class Wishlist(MembershipMixin, Store, RpcMixin):
     interface='WSShopMgmt'
 
     items = EmbeddedStoreField(target='entries', store_class=WishlistItem, is_array=True)
@@ -111,7 +203,8 @@ class Wishlist(Store, RpcMixin):
         return cls.signature(method='getCommercialWishList', args=[token])
 
 
-class Preorderlist(Store, RpcMixin):
+@async_twins
+class Preorderlist(MembershipMixin, MemoMixin, Store, RpcMixin):
     interface='WSShopMgmt'
 
     items = EmbeddedStoreField(target='entries', store_class=PreorderlistItem, is_array=True)
@@ -124,12 +217,18 @@ class Preorderlist(Store, RpcMixin):
     def get_by_token(cls, token):
         return cls.signature(method='getPreOrderList', args=[token])
 
+    @memoized_property
+    def _alert_index(self):
+        """Notifications grouped by normalized isbn and notification type."""
+        index = {}
+        for alert in self.notifications or []:
+            for alert_type in (PriceNotification, StateNotification):
+                if isinstance(alert, alert_type):
+                    index.setdefault((normalize_isbn(alert.isbn), alert_type), []).append(alert)
+        return index
+
     def _alerts(self, alert_type, doc):
-        alerts = []
-        for alert in self.notifications:
-            if isinstance(alert, alert_type) and alert.isbn == doc.isbn:
-                alerts.append(alert)
-        return alerts
+        return list(self._alert_index.get((normalize_isbn(doc.isbn), alert_type), ()))
 
     def price_alerts(self, doc):
         return self._alerts(PriceNotification, doc)
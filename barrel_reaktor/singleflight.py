@@ -0,0 +1,48 @@
+"""Deduplication of identical concurrent calls.
+
+While a call is in flight, other threads making the same call wait for it
+and get its result (the very same objects) or its exception, instead of
+sending their own request.
+"""
+import json
+import threading
+
+
+class _Flight(object):
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class Group(object):
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(interface, method, data_converter, args):
+        """Canonical key of a reaktor call."""
+        return interface, method, data_converter, json.dumps(args, sort_keys=True, default=repr)
+
+    def do(self, key, func):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = func()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.event.set()
+        return flight.value
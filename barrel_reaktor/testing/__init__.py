@@ -0,0 +1 @@
+"""Tools to exercise the models without a reaktor: synthetic data and a fake server."""
@@ -0,0 +1,232 @@
+"""Seeded generator of reaktor-like JSON payloads.
+
+The payloads use the keys the models read, with realistic sizes, so that
+they can be fed to the stores directly (benchmarks) or served by the fake
+reaktor. The same seed always produces the same catalog.
+"""
+import random
+
+
+LANGUAGES = ('de', 'en', 'fr', 'es', 'it')
+FORMATS = ('EPUB', 'PDF')
+DRM_TYPES = ('ADOBE_DRM', 'WATERMARK', 'NONE')
+WORDS = ('night', 'river', 'shadow', 'garden', 'winter', 'secret', 'letter', 'house',
+         'island', 'summer', 'stone', 'silver', 'empire', 'queen', 'storm', 'city')
+NAMES = ('Anna', 'Peter', 'Maria', 'Jonas', 'Clara', 'Felix', 'Lena', 'Paul')
+SURNAMES = ('Schmidt', 'Meyer', 'Weber', 'Wagner', 'Becker', 'Hoffmann', 'Koch')
+
+
+def _timestamp(rng):
+    return rng.randint(1262304000, 1420070400) * 1000
+
+
+def _money(amount, currency='EUR'):
+    return {'amount': round(amount, 2), 'currency': currency}
+
+
+class Catalog(object):
+    """`size` documents spread over a category tree of `depth` levels with
+    `breadth` children per category.
+    """
+    def __init__(self, seed=0, size=10000, depth=3, breadth=6, nature='txtr_de'):
+        self.seed = seed
+        self.nature = nature
+        rng = random.Random(seed)
+        self.categories = {}
+        self._add_categories(rng, None, depth, breadth)
+        self.leaves = sorted(c['ID'] for c in self.categories.values() if not c['childrenIDs'])
+        self.ids = ['%032x' % rng.getrandbits(128) for _ in range(size)]
+        self.isbns = dict((doc_id, '978%010d' % rng.randint(0, 10 ** 10 - 1)) for doc_id in self.ids)
+        self._documents = {}
+
+    def _add_categories(self, rng, parent_id, depth, breadth):
+        ids = []
+        for _ in range(breadth if parent_id else 2):
+            cat_id = 'cat%d' % len(self.categories)
+            category = {'ID': cat_id, 'name': ' '.join(rng.sample(WORDS, 2)).title(),
+                        'parentID': parent_id, 'childrenIDs': [], 'subtreeSize': 0}
+            self.categories[cat_id] = category
+            if depth > 1:
+                category['childrenIDs'] = self._add_categories(rng, cat_id, depth - 1, breadth)
+            ids.append(cat_id)
+        return ids
+
+    def trail(self, cat_id):
+        trail = []
+        while cat_id:
+            category = self.categories[cat_id]
+            trail.insert(0, dict(category))
+            cat_id = category['parentID']
+        return trail
+
+    def document(self, doc_id):
+        """Returns the `Document` payload for the id, `None` if unknown."""
+        if doc_id in self._documents:
+            return self._documents[doc_id]
+        if doc_id not in self.isbns:
+            return None
+        rng = random.Random('%s:%s' % (self.seed, doc_id))
+        title = ' '.join(rng.sample(WORDS, rng.randint(2, 4))).capitalize()
+        first_name, last_name = rng.choice(NAMES), rng.choice(SURNAMES)
+        category_id = rng.choice(self.leaves)
+        price = rng.choice((0.99, 4.99, 7.99, 9.99, 12.99, 19.99))
+        self._documents[doc_id] = document = {
+            'documentID': doc_id,
+            'displayName': title,
+            'type': 'CATALOG',
+            'catalogDocumentState': rng.choice(('RELEASED', 'RELEASED', 'PRE_RELEASE')),
+            'userDocumentState': '?',
+            'format': rng.choice(FORMATS),
+            'drm': rng.choice(DRM_TYPES),
+            'fileName': '%s.epub' % doc_id,
+            'hasBinary': True,
+            'hasThumbnail': True,
+            'creationTime': _timestamp(rng),
+            'modificationTime': _timestamp(rng),
+            'languageCode': rng.choice(LANGUAGES),
+            'version': 1,
+            'versionSize': rng.randint(10 ** 5, 10 ** 7),
+            'numberOfVotes': rng.randint(0, 500),
+            'cumulativeVotes': {'stars': rng.randint(0, 2500)},
+            'contentCategoryIDs': [category_id],
+            'contentCategories': self.trail(category_id),
+            'authors': [{'firstName': first_name, 'lastName': last_name}],
+            'licenses': [{'key': 'DEFAULT', 'currentUserRoles': ['READER']}],
+            'documentPreviews': [{'format': 'EPUB'}],
+            'userTags': [],
+            'attributes': {
+                'isbn': self.isbns[doc_id],
+                'title': title,
+                'author': '%s %s' % (first_name, last_name),
+                'author_biography': ' '.join(rng.choice(WORDS) for _ in range(40)),
+                'description': ' '.join(rng.choice(WORDS) for _ in range(150)),
+                'publisher': '%s Verlag' % rng.choice(SURNAMES),
+                'imprint': rng.choice(SURNAMES),
+                'language': rng.choice(LANGUAGES),
+                'number_of_pages': rng.randint(80, 900),
+                'size': rng.randint(10 ** 5, 10 ** 7),
+                'year': rng.randint(1950, 2014),
+                'publication_date': _timestamp(rng),
+                'price': price,
+                'undiscounted_price': price,
+                'currency': 'EUR',
+                'tax_group': 'EBOOK',
+                'cover_image_aspect_ratio': 0.66,
+                'cover_image_type': 'DEFAULT',
+                'cover_image_url_normal': 'http://covers.example.com/%s/normal.jpg' % doc_id,
+                'cover_image_url_medium': 'http://covers.example.com/%s/medium.jpg' % doc_id,
+                'cover_image_url_large': 'http://covers.example.com/%s/large.jpg' % doc_id,
+            },
+        }
+        return document
+
+    def documents(self, doc_ids):
+        return [d for d in (self.document(doc_id) for doc_id in doc_ids) if d is not None]
+
+    def search(self, query, offset=0, number_of_results=100, stats=True):
+        """Returns a `DocumentResult` payload; results depend on the query only."""
+        rng = random.Random('%s:%s' % (self.seed, query))
+        total = rng.randint(0, len(self.ids))
+        doc_ids = self.ids[:total]
+        page = doc_ids[offset:offset + number_of_results] if number_of_results >= 0 else doc_ids[offset:]
+        result = {
+            'numberOfResults': len(page),
+            'totalNumberOfResults': total,
+            'offset': offset,
+            'hasLess': offset > 0,
+            'hasMore': offset + len(page) < total,
+            'results': [{'searchResult': self.document(doc_id), 'relevance': rng.random()}
+                        for doc_id in page],
+        }
+        if stats:
+            result['relatedObjects'] = self.stats(rng)
+        return result
+
+    def stats(self, rng):
+        def facet(values):
+            return [{'name': v, 'label': v, 'count': rng.randint(1, 5000)} for v in values]
+        return {
+            'category': [{'id': c, 'name': self.categories[c]['name'], 'count': rng.randint(1, 5000)}
+                         for c in self.leaves[:30]],
+            'drmType': facet(DRM_TYPES),
+            'format': facet(FORMATS),
+            'language': facet(LANGUAGES),
+            'price': facet(('0-5', '5-10', '10-20', '20-')),
+            'publication_date': facet([str(y) for y in range(2000, 2015)]),
+            'rating': facet(['1', '2', '3', '4', '5']),
+            'source': facet(('shop', 'community')),
+            'tag': facet(WORDS),
+        }
+
+    def basket(self, positions=50, vouchers=2, basket_id='basket0'):
+        rng = random.Random('%s:basket:%s' % (self.seed, basket_id))
+        items = []
+        total = 0
+        for doc_id in rng.sample(self.ids, positions):
+            document = self.document(doc_id)
+            price = document['attributes']['price']
+            total += price
+            items.append({
+                'itemType': 'DOCUMENT',
+                'item': document,
+                'positionTotal': _money(price),
+                'positionNetTotal': _money(price / 1.19),
+                'positionTaxTotal': _money(price - price / 1.19),
+                'undiscountedPositionTotal': _money(price),
+            })
+        return {
+            'ID': basket_id,
+            'checkedOut': False,
+            'creationTime': _timestamp(rng),
+            'modificationTime': _timestamp(rng),
+            'country': 'DE',
+            'total': _money(total),
+            'netTotal': _money(total / 1.19),
+            'taxTotal': _money(total - total / 1.19),
+            'undiscountedTotal': _money(total),
+            'positions': items,
+            'authorizedPaymentMethods': ['CREDITCARD'],
+            'voucherApplications': [{
+                'voucher': {'code': 'CODE%d' % i, 'text': 'Voucher', 'percentage': 10,
+                            'javaClass': 'com.bookpac.server.shop.voucher.WSTPercentVoucher'},
+                'discountAmount': _money(1.0),
+            } for i in range(vouchers)],
+        }
+
+    def document_list(self, size=10000, list_id='list0', offset=0, number_of_results=-1):
+        doc_ids = (self.ids * (size // len(self.ids) + 1))[:size]
+        page = doc_ids[offset:offset + number_of_results] if number_of_results >= 0 else doc_ids[offset:]
+        return {'ID': list_id, 'name': list_id, 'description': '', 'owner': 'user0',
+                'creationTime': 1262304000000, 'documentIDs': page, 'count': len(page),
+                'offset': offset, 'size': size}
+
+    def shopping_list(self, entries=20, notifications=0, list_id='wishlist'):
+        rng = random.Random('%s:%s' % (self.seed, list_id))
+        doc_ids = rng.sample(self.ids, entries)
+        data = {'entries': [{'document': self.document(doc_id), 'creationDate': _timestamp(rng),
+                             'prePaid': False} for doc_id in doc_ids]}
+        if notifications:
+            alerts = []
+            for i in range(notifications):
+                doc_id = rng.choice(doc_ids)
+                alert = {'ID': 'n%d' % i, 'isbn': int(self.isbns[doc_id]), 'displayName': doc_id,
+                         'creationTime': _timestamp(rng)}
+                if rng.random() < 0.8:
+                    old, new = rng.choice((4.99, 9.99)), rng.choice((2.99, 12.99))
+                    alert.update({'type': 'DOCUMENT_LESS_EXPENSIVE' if new < old else 'DOCUMENT_MORE_EXPENSIVE',
+                                  'oldPrice': _money(old), 'newPrice': _money(new)})
+                else:
+                    alert.update({'type': 'DOCUMENT_REMOVED', 'oldState': 'RELEASED', 'newState': 'REMOVED'})
+                alerts.append(alert)
+            data['notifications'] = alerts
+        return data
+
+    def user(self, user_id='user0'):
+        return {'userID': user_id, 'userName': user_id, 'EMail': '%s@example.com' % user_id,
+                'userNature': self.nature, 'roles': ['USER', 'SHOP_CUSTOMER'], 'emailVerified': True,
+                'disabled': False, 'settings': {'com.bookpac.user.settings.locale': 'de_DE',
+                                                'com.bookpac.user.settings.shop.country': 'DE'}}
+
+    def auth(self, token, user_id='user0'):
+        return {'token': token, 'resultCode': 'SUCCESS', 'authenticationServiceName': 'LOCAL',
+                'timestamp': 1262304000000, 'user': self.user(user_id)}
@@ -0,0 +1,440 @@
+"""Fake reaktor JSON-RPC server, serving a seeded `Catalog`.
+
+It implements the methods the models call, with configurable per method
+latency, error rate and payload padding, which makes it suitable for load
+tests. Requests are JSON-RPC objects (or batches, as lists of them) whose
+`method` is either `Interface.method` or the bare method name:
+
+    python -m barrel_reaktor.testing.server --port 8080 --profiles profiles.json
+
+where `profiles.json` maps method names (`*` for the default) to `Profile`
+keyword arguments, e.g. `{"searchDocuments": {"latency": 0.2, "error_rate": 0.01}}`.
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import uuid
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+except ImportError:  # python 3
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+
+from barrel_reaktor import RpcError
+from barrel_reaktor.testing.catalog import Catalog
+
+
+class Profile(object):
+    """Behaviour of a method: log-normal latency with the given median (in
+    seconds) and `jitter` shape, probability of failing, and extra bytes of
+    padding added to the response.
+    """
+    def __init__(self, latency=0.0, jitter=0.5, error_rate=0.0, padding=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.padding = padding
+
+    def delay(self, rng):
+        if not self.latency:
+            return 0
+        return self.latency * math.exp(rng.gauss(0, self.jitter))
+
+
+class FakeReaktor(object):
+    """Dispatches reaktor calls to the `rpc_<method>` handlers, which serve
+    the catalog and keep some per token state (basket and wishlist changes).
+    """
+    def __init__(self, catalog=None, profiles=None, seed=0, basket_size=5, list_size=1000):
+        self.catalog = catalog or Catalog(seed=seed)
+        self.profiles = dict(profiles or {})
+        self.basket_size = basket_size
+        self.list_size = list_size
+        self.calls = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._wishlists = {}
+        self._baskets = {}
+        self._cleared = set()
+        self._vouchers = {}
+        self._lists = {}
+
+    def profile(self, method):
+        return self.profiles.get(method) or self.profiles.get('*') or Profile()
+
+    def draw(self, profile):
+        """Returns `(delay, fails)` for one call."""
+        with self._lock:
+            return profile.delay(self._rng), self._rng.random() < profile.error_rate
+
+    def call(self, method, params):
+        name = method.rsplit('.', 1)[-1]
+        handler = getattr(self, 'rpc_%s' % name, None)
+        if handler is None:
+            raise RpcError('Unknown method: %s' % method)
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        return handler(*params)
+
+    # WSDocMgmt
+
+    def rpc_getDocument(self, token, doc_id):
+        return self.catalog.document(doc_id)
+
+    def rpc_getDocuments(self, token, doc_ids):
+        return self.catalog.documents(doc_ids)
+
+    def rpc_getDocumentsRelatedToDocument(self, token, doc_id, offset=0, number_of_results=5):
+        return self.catalog.documents(self.catalog.ids[offset + 1:offset + 1 + number_of_results])
+
+    def rpc_getDocumentsInContentCategory(self, token, cat_id, include_sub_cats=False, sort=None, invert=False, offset=0, number_of_results=-1):
+        doc_ids = [i for i in self.catalog.ids if self.catalog.document(i)['contentCategoryIDs'][0] == cat_id]
+        return self.catalog.documents(_page(doc_ids, offset, number_of_results))
+
+    def rpc_changeDocumentBasketPosition(self, token, basket_id, doc_id, quantity):
+        with self._lock:
+            positions = self._baskets.setdefault(token, [])
+            if doc_id in positions:
+                positions.remove(doc_id)
+            if quantity:
+                positions.append(doc_id)
+
+    def rpc_changeDocumentAttributes(self, token, doc_ids, attributes):
+        return None
+
+    def rpc_getUserDocumentID(self, token, doc_id):
+        return 'user-%s' % doc_id
+
+    def rpc_unzipEpubUserDocument(self, token, doc_id):
+        return '/unzipped/user/%s' % doc_id
+
+    def rpc_unzipEpubPreview(self, token, doc_id):
+        return '/unzipped/preview/%s' % doc_id
+
+    def rpc_removeCoverImage(self, token, doc_id):
+        return None
+
+    def rpc_postVoteForDocument(self, token, doc_id, vote):
+        return None
+
+    def rpc_removeDocumentsInList(self, token, list_id, keep_in_other_lists=True):
+        return None
+
+    # WSContentPresentationMgmt
+
+    def rpc_getContentPresentationDocuments(self, token, affiliate, presentation_id, offset=0, number_of_results=-1, sort=None, invert=False):
+        doc_ids = random.Random('%s:%s' % (self.catalog.seed, presentation_id)).sample(
+            self.catalog.ids, min(100, len(self.catalog.ids)))
+        return self.catalog.documents(_page(doc_ids, offset, number_of_results))
+
+    # WSSearchDocument
+
+    def rpc_searchDocuments(self, token, search_string, sources=None, offset=0, number_of_results=10, sort=None, invert=False, related=None, include_search_fields=None, options=None):
+        if search_string.startswith('isbn:'):
+            isbns = set(search_string.replace('isbn:', ' ').replace('OR', ' ').split())
+            doc_ids = [i for i, isbn in self.catalog.isbns.items() if isbn in isbns]
+            page = _page(doc_ids, offset, number_of_results)
+            return {'numberOfResults': len(page), 'totalNumberOfResults': len(doc_ids), 'offset': offset,
+                    'hasLess': offset > 0, 'hasMore': offset + len(page) < len(doc_ids),
+                    'results': [{'searchResult': self.catalog.document(i), 'relevance': 1.0} for i in page]}
+        return self.catalog.search(search_string, offset, number_of_results)
+
+    def rpc_getSuggestionObjects(self, token, search_string, sources=None, number_of_results=5):
+        return self.catalog.documents(self.catalog.ids[:number_of_results])
+
+    def rpc_getSuggestionObjectsWithHighlights(self, token, search_string, sources=None, number_of_results=5, highlight=None):
+        return self.rpc_getSuggestionObjects(token, search_string, sources, number_of_results)
+
+    # WSShopMgmt
+
+    def rpc_getBasket(self, token, basket_id=None):
+        with self._lock:
+            cleared = token in self._cleared
+            extra = list(self._baskets.get(token, []))
+            vouchers = list(self._vouchers.get(token, []))
+        basket = self.catalog.basket(0 if cleared else self.basket_size, 0 if cleared else 2,
+                                     basket_id=basket_id or 'basket-%s' % token)
+        basket['voucherApplications'].extend({
+            'voucher': {'code': code, 'text': 'Voucher', 'percentage': 10,
+                        'javaClass': 'com.bookpac.server.shop.voucher.WSTPercentVoucher'},
+            'discountAmount': {'amount': 1.0, 'currency': 'EUR'},
+        } for code in vouchers)
+        for doc_id in extra:
+            document = self.catalog.document(doc_id)
+            if document is not None:
+                price = {'amount': document['attributes']['price'], 'currency': 'EUR'}
+                basket['positions'].append({'itemType': 'DOCUMENT', 'item': document, 'positionTotal': price,
+                                            'positionNetTotal': price, 'positionTaxTotal': price,
+                                            'undiscountedPositionTotal': price})
+        return basket
+
+    def rpc_getDefaultBasket(self, token, marker=None):
+        return self.rpc_getBasket(token)
+
+    def rpc_getNewPreviewBasket(self, token, marker=None):
+        return self.rpc_getBasket(token)
+
+    def rpc_getValidationBasket(self, token, marker=None):
+        return self.rpc_getBasket(token)
+
+    def rpc_getNewBasket(self, token, marker=None):
+        self.rpc_removeAllBasketPositions(token, None)
+        return self.rpc_getBasket(token, 'basket-%s' % uuid.uuid4().hex)
+
+    def rpc_getFreeBasket(self, token, marker=None):
+        return self.catalog.basket(0, 0, basket_id='free-%s' % token)
+
+    def rpc_removeAllBasketPositions(self, token, basket_id):
+        with self._lock:
+            self._cleared.add(token)
+            self._baskets.pop(token, None)
+            self._vouchers.pop(token, None)
+
+    def rpc_checkoutBasketAsynchronously(self, token, basket_id, checkout_props):
+        basket = self.rpc_getBasket(token, basket_id)
+        basket['checkedOut'] = True
+        self.rpc_removeAllBasketPositions(token, basket_id)
+        return {'resultCode': 'SUCCESS', 'receiptIdentifier': uuid.uuid4().hex,
+                'transactionID': uuid.uuid4().hex, 'basket': basket}
+
+    def rpc_getCommercialWishList(self, token):
+        data = self.catalog.shopping_list(20, list_id='wishlist-%s' % token)
+        with self._lock:
+            added, removed = self._wishlists.get(token, (set(), set()))
+        data['entries'] = [e for e in data['entries'] if e['document']['documentID'] not in removed]
+        data['entries'].extend({'document': self.catalog.document(i), 'creationDate': 0} for i in added)
+        return data
+
+    def rpc_addDocumentToCommercialWishList(self, token, doc_id):
+        with self._lock:
+            added, removed = self._wishlists.setdefault(token, (set(), set()))
+            added.add(doc_id)
+            removed.discard(doc_id)
+
+    def rpc_removeDocumentFromCommercialWishList(self, token, doc_id):
+        with self._lock:
+            added, removed = self._wishlists.setdefault(token, (set(), set()))
+            added.discard(doc_id)
+            removed.add(doc_id)
+
+    def rpc_getPreOrderList(self, token):
+        return self.catalog.shopping_list(20, 100, list_id='preorders-%s' % token)
+
+    def rpc_removeDocumentFromPreOrderList(self, token, doc_id):
+        return None
+
+    # WSListMgmt
+
+    def rpc_getList(self, token, list_id, offset=0, number_of_results=-1):
+        return self.catalog.document_list(self.list_size, list_id, offset, number_of_results)
+
+    def rpc_getListConstrained(self, token, list_id, search_string, offset=0, number_of_results=-1):
+        return self.catalog.document_list(self.list_size // 10, list_id, offset, number_of_results)
+
+    def rpc_getSpecialList(self, token, type, offset=0, number_of_results=-1):
+        return self.catalog.document_list(self.list_size, '%s-%s' % (type, token), offset, number_of_results)
+
+    def rpc_changeListSorting(self, token, list_id, sort, invert):
+        return None
+
+    def rpc_getLists(self, token, list_ids):
+        return [self.catalog.document_list(self.list_size, list_id, 0, 0) for list_id in list_ids]
+
+    def rpc_getListList(self, token):
+        with self._lock:
+            return ['list0'] + list(self._lists.get(token, []))
+
+    def rpc_getListsWithDocumentList(self, token, document_ids):
+        return self.rpc_getListList(token)
+
+    def rpc_createList(self, token, name, description=''):
+        list_id = 'list-%s' % uuid.uuid4().hex
+        with self._lock:
+            self._lists.setdefault(token, []).append(list_id)
+        return list_id
+
+    def rpc_deleteList(self, token, list_id, delete_documents=False):
+        with self._lock:
+            lists = self._lists.get(token, [])
+            if list_id in lists:
+                lists.remove(list_id)
+
+    def rpc_addDocumentsToList(self, token, list_id, document_ids, index=0):
+        return None
+
+    def rpc_removeDocumentsFromList(self, token, list_id, document_ids):
+        return None
+
+    # WSContentCategoryMgmt
+
+    def rpc_getContentCategory(self, token, cat_id, with_children=True, sort=None, invert=False, offset=0, number_of_results=-1):
+        category = self.catalog.categories.get(cat_id)
+        if category is None:
+            return None
+        category = dict(category)
+        doc_ids = [i for i in self.catalog.ids if self.catalog.document(i)['contentCategoryIDs'][0] == cat_id]
+        category['documentIDs'] = _page(doc_ids, int(offset), number_of_results)
+        category['count'] = len(category['documentIDs'])
+        return category
+
+    def rpc_getCatalogContentCategoryRootsForUser(self, token, depth=0, min_number_of_documents=0):
+        return [dict(c) for c in self.catalog.categories.values() if not c['parentID']]
+
+    # WSAuth, WSUserMgmt
+
+    def rpc_authenticate(self, *args):
+        return self.catalog.auth(uuid.uuid4().hex)
+
+    def rpc_authenticateAnonymousUser(self, nature):
+        return self.catalog.auth(uuid.uuid4().hex, 'anonymous')
+
+    def rpc_authenticateWithExternalCredentials(self, token, service_name, params, sticky=False):
+        return self.catalog.auth(uuid.uuid4().hex)
+
+    def rpc_promoteAnonymousUser(self, token, *args):
+        return self.catalog.auth(uuid.uuid4().hex)
+
+    def rpc_createUserWithSettings(self, name, email, hashed_pwd, settings, nature):
+        return self.catalog.user(name)
+
+    def rpc_requestUserCreationWithSettings(self, name, email, hashed_pwd, settings, nature):
+        return None
+
+    def rpc_requestPasswordResetForUser(self, name, nature):
+        return None
+
+    def rpc_execute(self, token, action, secret, params):
+        return None
+
+    def rpc_deAuthenticate(self, token):
+        return None
+
+    def rpc_getUser(self, token):
+        return self.catalog.user()
+
+    # WSReaktorMgmt, WSVoucherMgmt
+
+    def rpc_getNature(self, name):
+        return {'name': name, 'shopCurrency': 'EUR', 'homeCountry': 'DE',
+                'passwordPolicy': {'minimumLength': 6}, 'addressFormat': {'fmt': '%N%n%A%n%Z %C'}}
+
+    def rpc_getCompany(self, name):
+        return {'name': name, 'natures': [self.rpc_getNature(self.catalog.nature)]}
+
+    def rpc_getAssignedVouchers(self, token):
+        with self._lock:
+            codes = list(self._vouchers.get(('assigned', token), []))
+        return [{'code': code, 'text': 'Voucher', 'percentage': 10} for code in codes]
+
+    def rpc_addVoucherToBasket(self, token, code, basket_id):
+        with self._lock:
+            self._vouchers.setdefault(token, []).append(code)
+        return {'resultCode': 'SUCCESS', 'basket': self.rpc_getBasket(token, basket_id)}
+
+    def rpc_removeVoucherFromBasket(self, token, code, basket_id):
+        with self._lock:
+            codes = self._vouchers.get(token, [])
+            if code in codes:
+                codes.remove(code)
+        return {'resultCode': 'SUCCESS', 'basket': self.rpc_getBasket(token, basket_id)}
+
+    def rpc_assignVoucherToUserAccount(self, token, code):
+        with self._lock:
+            self._vouchers.setdefault(('assigned', token), []).append(code)
+        return {'resultCode': 'SUCCESS'}
+
+    # HTTP
+
+    def serve(self, host='127.0.0.1', port=8080):
+        """Starts serving in a daemon thread, returns the server."""
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.reaktor = self
+        thread = threading.Thread(target=server.serve_forever, name='fake-reaktor')
+        thread.daemon = True
+        thread.start()
+        return server
+
+
+def _page(items, offset, number_of_results):
+    if number_of_results is None or number_of_results < 0:
+        return items[offset:]
+    return items[offset:offset + number_of_results]
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        try:
+            request = json.loads(body.decode('utf-8'))
+        except ValueError:
+            return self.reply({'id': None, 'result': None, 'error': {'code': -32700, 'message': 'Parse error'}})
+        if isinstance(request, list):
+            return self.reply([self.dispatch(r) for r in request])
+        return self.reply(self.dispatch(request))
+
+    def dispatch(self, request):
+        reaktor = self.server.reaktor
+        method = request.get('method', '')
+        profile = reaktor.profile(method.rsplit('.', 1)[-1])
+        delay, fails = reaktor.draw(profile)
+        if delay:
+            threading.Event().wait(delay)
+        response = {'id': request.get('id'), 'result': None, 'error': None}
+        if fails:
+            response['error'] = {'code': 500, 'message': 'Injected failure'}
+            return response
+        try:
+            response['result'] = reaktor.call(method, request.get('params') or [])
+        except RpcError as e:
+            response['error'] = {'code': -32601, 'message': str(e)}
+        except Exception as e:
+            response['error'] = {'code': 500, 'message': repr(e)}
+        if profile.padding:
+            response['padding'] = ' ' * profile.padding
+        return response
+
+    def reply(self, response):
+        body = json.dumps(response).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake reaktor JSON-RPC server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--size', type=int, default=10000, help='number of documents in the catalog')
+    parser.add_argument('--profiles', help='JSON file mapping method names to profiles')
+    options = parser.parse_args()
+    profiles = {}
+    if options.profiles:
+        with open(options.profiles) as f:
+            profiles = dict((name, Profile(**kwargs)) for name, kwargs in json.load(f).items())
+    reaktor = FakeReaktor(Catalog(seed=options.seed, size=options.size), profiles, seed=options.seed)
+    server = ThreadingHTTPServer((options.host, options.port), Handler)
+    server.reaktor = reaktor
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
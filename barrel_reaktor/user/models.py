@@ -1,9 +1,14 @@
 from barrel import Store, Field, BooleanField, DateField, EmbeddedStoreField
-from barrel.rpc import RpcMixin
+from barrel_reaktor.aio import async_twins, sync_only
+from barrel_reaktor.models import MemoMixin, memoized_property
+from barrel_reaktor.rpc import RpcMixin
 
 
-class User(Store, RpcMixin):
+@async_twins
+class User(MemoMixin, Store, RpcMixin):
     interface = "WSUserMgmt"
+    # Set to a `barrel_reaktor.cache.LRUCache` to cache users by token.
+    cache = None
 
     class Address(Store):
         country = Field(target='com.bookpac.user.settings.shop.country')
@@ -29,14 +34,33 @@ class User(Store, RpcMixin):
     roles = Field(target='roles')
     verified = BooleanField(target='emailVerified')
 
+    @memoized_property
+    def role_set(self):
+        return frozenset(self.roles or ())
+
     def has_role(self, role):
-        return role in self.roles
+        return role in self.role_set
 
     @classmethod
     def get_by_token(cls, token):
-        return cls.signature(method='getUser', args=[token])
+        if cls.cache is not None:
+            user = cls.cache.get(token)
+            if user is not None:
+                return user
+        user = cls.signature(method='getUser', args=[token])
+        if cls.cache is not None and user is not None:
+            cls.cache.set(token, user)
+        return user
+
+    @classmethod
+    @sync_only
+    def forget(cls, *tokens):
+        """Drops the cached users of the given tokens."""
+        if cls.cache is not None:
+            cls.cache.delete_many(tokens)
 
 
+@async_twins
 class Auth(Store, RpcMixin):
     interface = "WSAuth"
 
@@ -50,23 +74,31 @@ class Auth(Store, RpcMixin):
     def is_local(self):
         return self.service_name == 'LOCAL'
 
+    @classmethod
+    def _authenticated(cls, auth, *stale_tokens):
+        """Caches the user embedded in the auth result, if any."""
+        User.forget(*stale_tokens)
+        if User.cache is not None and auth is not None and auth.token and auth.user is not None:
+            User.cache.set(auth.token, auth.user)
+        return auth
+
     @classmethod
     def authenticate_with_credentials(cls, name, hashed_pwd,
                                       nature, sticky=False):
         """Regular auth."""
-        return cls.signature(method='authenticate',
-                             args=[name, hashed_pwd, nature, sticky])
+        return cls._authenticated(cls.signature(method='authenticate',
+                                                args=[name, hashed_pwd, nature, sticky]))
 
     @classmethod
     def authenticate_with_external_credentials(cls, token, service_name,
                                                params, sticky=False):
         """Auth using external credentials (e.g. Facebook)."""
-        return cls.signature(method='authenticateWithExternalCredentials',
-                             args=[token, service_name, params, sticky])
+        return cls._authenticated(cls.signature(method='authenticateWithExternalCredentials',
+                                                args=[token, service_name, params, sticky]), token)
 
     @classmethod
     def authenticate_as_anonymous(cls, nature):
-        return cls.signature(method='authenticateAnonymousUser', args=[nature])
+        return cls._authenticated(cls.signature(method='authenticateAnonymousUser', args=[nature]))
 
     @classmethod
     def authenticate_anonymous(cls, token, name,
@@ -74,19 +106,21 @@ class Auth(Store, RpcMixin):
         """Regular auth, for an anonymous user who wants to authenticate
         himself while retaining his anonymous data (e.g. his basket).
         """
-        return cls.signature(method='authenticate',
-                             args=[token, name, hashed_pwd, sticky])
+        return cls._authenticated(cls.signature(method='authenticate',
+                                                args=[token, name, hashed_pwd, sticky]), token)
 
     @classmethod
     def deauthenticate(cls, token):
-        return cls.signature(method='deAuthenticate', args=[token])
+        result = cls.signature(method='deAuthenticate', args=[token])
+        User.forget(token)
+        return result
 
     @classmethod
     def create_user_from_anonymous(cls, token, name, email, captcha_id,
                                    captcha_value, hashed_pwd1, hashed_pwd2):
-        return cls.signature(method='promoteAnonymousUser',
-                             args=[token, name, email, captcha_id,
-                                   captcha_value, hashed_pwd1, hashed_pwd2])
+        return cls._authenticated(cls.signature(method='promoteAnonymousUser',
+                                                args=[token, name, email, captcha_id,
+                                                      captcha_value, hashed_pwd1, hashed_pwd2]), token)
 
     @classmethod
     def create_user(cls, name, email, hashed_pwd, settings, nature):
@@ -105,6 +139,8 @@ class Auth(Store, RpcMixin):
 
     @classmethod
     def reset_password(cls, token, action, secret, hashed_pwd):
-        return cls.signature(interface='WSActionRequestMgmt',
-                             method='execute',
-                             args=[token, action, secret, {'pw': hashed_pwd}])
+        result = cls.signature(interface='WSActionRequestMgmt',
+                               method='execute',
+                               args=[token, action, secret, {'pw': hashed_pwd}])
+        User.forget(token)
+        return result
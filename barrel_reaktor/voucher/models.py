@@ -1,11 +1,13 @@
 from barrel import Store, Field, DateField, IntField, EmbeddedStoreField
-from barrel.rpc import RpcMixin
+from barrel_reaktor.aio import async_twins
 from barrel_reaktor.models import Price
+from barrel_reaktor.rpc import RpcMixin
 from money import Money
 
 
 # FIXME: this class is used as embedded for `voucherApplications` as well as for `Voucher` - a gift card
 # thus it might differ from the voucher that comes in the basket position (gift card)
+@async_twins
 class Voucher(Store, RpcMixin):
     interface = 'WSVoucherMgmt'
     
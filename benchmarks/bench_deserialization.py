@@ -0,0 +1,134 @@
+"""Offline benchmarks of the conversion of reaktor payloads into stores.
+
+    python benchmarks/bench_deserialization.py            # run and print
+    python benchmarks/bench_deserialization.py --save     # store as baseline
+    python benchmarks/bench_deserialization.py --compare  # fail on regressions
+
+Fixtures come from `barrel_reaktor.testing.catalog`, so no reaktor is needed.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+try:
+    import tracemalloc
+except ImportError:  # python 2
+    tracemalloc = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from barrel_reaktor.basket.models import Basket
+from barrel_reaktor.document.models import Document
+from barrel_reaktor.document_list.models import List
+from barrel_reaktor.search.models import DocumentResult
+from barrel_reaktor.shopping_list.models import Preorderlist
+from barrel_reaktor.testing.catalog import Catalog
+
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def read_tile(document):
+    return (document.id, document.title, document.author, document.price,
+            document.medium_cover_url, document.is_preorder)
+
+
+def read_basket(basket):
+    return (basket.total, basket.net_total, basket.tax_total, basket.undiscounted_total,
+            basket.is_regular, basket.is_preorder, [i.total for i in basket.items],
+            [v.discount for v in basket.vouchers])
+
+
+def read_preorders(preorderlist):
+    return [(preorderlist.price_alerts(item.document), preorderlist.state_alerts(item.document))
+            for item in preorderlist.items]
+
+
+def scenarios(catalog):
+    document = catalog.document(catalog.ids[0])
+    search_page = catalog.search('bench', 0, 100)
+    basket = catalog.basket(50)
+    library = catalog.document_list(10000)
+    preorders = catalog.shopping_list(200, 2000, 'preorders')
+    return [
+        ('document.build', lambda: Document(document)),
+        ('document.categories', lambda: Document(document).categories),
+        ('document.tile', lambda: read_tile(Document(document))),
+        ('search.build_100', lambda: DocumentResult(search_page)),
+        ('search.tiles_100', lambda: [read_tile(i.document) for i in DocumentResult(search_page).items]),
+        ('search.stats', lambda: DocumentResult(search_page).stats.language),
+        ('basket.build_50', lambda: Basket(basket)),
+        ('basket.totals_50', lambda: read_basket(Basket(basket))),
+        ('list.build_10k', lambda: List(library).document_ids),
+        ('preorderlist.alerts_200', lambda: read_preorders(Preorderlist(preorders))),
+    ]
+
+
+def measure(func, min_time):
+    """Returns the mean time of a call, and the peak memory of one call."""
+    func()
+    runs, start = 0, time.time()
+    while True:
+        func()
+        runs += 1
+        elapsed = time.time() - start
+        if elapsed >= min_time:
+            break
+    peak = None
+    if tracemalloc is not None:
+        gc.collect()
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return elapsed / runs, peak
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, result in sorted(results.items()):
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        for key in ('time', 'peak'):
+            if result[key] and reference.get(key) and result[key] > reference[key] * (1 + tolerance):
+                regressions.append('%s %s: %.4g > %.4g' % (name, key, result[key], reference[key]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--min-time', type=float, default=0.5, help='seconds spent per scenario')
+    parser.add_argument('--filter', default='', help='only run scenarios containing this string')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save', action='store_true', help='store the results as the baseline')
+    parser.add_argument('--compare', action='store_true', help='exit with 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown ratio')
+    options = parser.parse_args()
+
+    results = {}
+    for name, func in scenarios(Catalog(seed=options.seed)):
+        if options.filter not in name:
+            continue
+        mean, peak = measure(func, options.min_time)
+        results[name] = {'time': mean, 'peak': peak}
+        print('%-26s %10.1f us/op %10s bytes peak' % (name, mean * 1e6, peak if peak is not None else '-'))
+
+    if options.save:
+        with open(options.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if options.compare:
+        with open(options.baseline) as f:
+            regressions = compare(results, json.load(f), options.tolerance)
+        for regression in regressions:
+            print('REGRESSION %s' % regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import unittest
+
+from barrel_reaktor import aio, cache
+
+try:
+    from barrel_reaktor.document.models import Document
+    from barrel_reaktor.document_list.models import List
+except ImportError:  # barrel or its dependencies are not installed
+    Document = List = None
+
+try:
+    from unittest import mock
+except ImportError:  # python 2
+    try:
+        import mock
+    except ImportError:
+        mock = None
+
+
+def run_replay(func, responses, *args):
+    """Drives a `Replay` like a transport runner, answering the calls from
+    `responses` (by method, or a function of the arguments) and returning
+    the result and the calls made.
+    """
+    replay = aio.Replay()
+    calls = []
+    while True:
+        try:
+            return replay.run(func, args, {}), calls
+        except aio.Pending as pending:
+            calls.append((pending.method, pending.params))
+            value = responses[pending.method]
+            if callable(value):
+                value = value(pending.params)
+            if isinstance(value, Exception):
+                replay.record(pending, error=value)
+            else:
+                replay.record(pending, value)
+
+
+class ReplayTest(unittest.TestCase):
+    def run_replay(self, func, responses):
+        return run_replay(func, responses)
+
+    def test_method_is_replayed_with_the_responses(self):
+        def method():
+            replay = aio.replaying()
+            user = replay.signature('WSUserMgmt', 'getUser', dict, ['token'])
+            documents = replay.signature('WSDocMgmt', 'getDocuments', dict, ['token', user['ids']])
+            return [d['documentID'] for d in documents]
+        result, calls = self.run_replay(method, {
+            'getUser': {'ids': ['a', 'b']},
+            'getDocuments': [{'documentID': 'a'}, {'documentID': 'b'}],
+        })
+        self.assertEqual(result, ['a', 'b'])
+        self.assertEqual(calls, [('getUser', ['token']), ('getDocuments', ['token', ['a', 'b']])])
+        self.assertIsNone(aio.replaying())
+
+    def test_errors_are_raised_where_the_call_is_made(self):
+        def method():
+            try:
+                aio.replaying().signature('WSDocMgmt', 'getDocument', dict, ['token', 'x'])
+            except ValueError:
+                return 'missing'
+        self.assertEqual(self.run_replay(method, {'getDocument': ValueError()})[0], 'missing')
+
+    def test_pending_is_not_caught_by_except_exception(self):
+        def method():
+            try:
+                aio.replaying().signature('WSDocMgmt', 'getDocument', dict, [])
+            except Exception:
+                return 'swallowed'
+            return 'done'
+        self.assertEqual(self.run_replay(method, {'getDocument': {}})[0], 'done')
+
+    def test_runs_may_make_other_calls(self):
+        cached = {}
+
+        def method():
+            replay = aio.replaying()
+            if 'user' not in cached:
+                cached['user'] = replay.signature('WSUserMgmt', 'getUser', dict, ['token'])
+            return replay.signature('WSDocMgmt', 'getDocument', dict, ['token', 'a'])
+        result, calls = self.run_replay(method, {'getUser': {}, 'getDocument': {'documentID': 'a'}})
+        self.assertEqual(result, {'documentID': 'a'})
+        self.assertEqual([method for method, _ in calls], ['getUser', 'getDocument'])
+
+    def test_responses_are_recorded_by_arguments(self):
+        runs = []
+
+        def method():
+            runs.append(True)
+            # another coroutine cached 'a' after the first run
+            ids = ['a', 'b'] if len(runs) == 1 else ['b']
+            documents = aio.replaying().signature('WSDocMgmt', 'getDocuments', dict, ['token', ids])
+            return [d['documentID'] for d in documents]
+        result, calls = self.run_replay(method, {
+            'getDocuments': lambda params: [{'documentID': i} for i in params[1]]})
+        self.assertEqual(result, ['b'])
+        self.assertEqual(calls, [('getDocuments', ['token', ['a', 'b']]), ('getDocuments', ['token', ['b']])])
+
+    def test_convert(self):
+        self.assertIsNone(aio.convert(dict, None))
+        self.assertEqual(aio.convert(len, ['ab', 'c']), [2, 1])
+        self.assertEqual(aio.convert(len, 'ab'), 2)
+
+
+class Model(object):
+    @classmethod
+    def get(cls):
+        pass
+
+    @classmethod
+    @aio.sync_only
+    def iter_all(cls):
+        pass
+
+    @classmethod
+    def _private(cls):
+        pass
+
+
+class AsyncTwinsTest(unittest.TestCase):
+    def test_only_rpc_methods_get_twins(self):
+        aio.async_twins(Model)
+        self.assertTrue(hasattr(Model, 'aget'))
+        self.assertFalse(hasattr(Model, 'aiter_all'))
+        self.assertFalse(hasattr(Model, 'a_private'))
+
+
+@unittest.skipIf(Document is None or mock is None, 'barrel is not installed')
+class CachingModelsReplayTest(unittest.TestCase):
+    """Models filling caches while they are replayed."""
+    def patch(self, *args):
+        patch = mock.patch.object(*args)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_list_filter_with_sortings(self):
+        self.patch(List, 'sortings', cache.LRUCache())
+        responses = {'changeListSorting': True,
+                     'getList': {'ID': 'list0', 'documentIDs': ['a', 'b']}}
+        result, calls = run_replay(List.filter, responses, 'token', 'list0')
+        self.assertEqual(result.document_ids, ['a', 'b'])
+        self.assertEqual([method for method, _ in calls], ['changeListSorting', 'getList'])
+
+    def test_document_get_by_isbn_with_isbn_index(self):
+        self.patch(Document, 'isbn_index', cache.IsbnIndex())
+        self.patch(Document, 'missing', None)
+        self.patch(cache, 'natures', cache.LRUCache())
+        responses = {'getUser': {'userNature': 'nature'},
+                     'searchDocuments': {'results': [{'searchResult': {
+                         'documentID': 'a', 'type': 'CATALOG', 'attributes': {'isbn': '9780000000001'}}}]}}
+        result, calls = run_replay(Document.get_by_isbn, responses, 'token', '9780000000001')
+        self.assertEqual(result.id, 'a')
+        self.assertEqual([method for method, _ in calls], ['getUser', 'searchDocuments'])
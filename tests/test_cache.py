@@ -0,0 +1,137 @@
+import time
+import unittest
+
+from barrel_reaktor.cache import LRUCache, MissingCache, StoreCache
+
+try:
+    from barrel_reaktor.document.models import Document
+except ImportError:  # barrel or its dependencies are not installed
+    Document = None
+
+try:
+    from unittest import mock
+except ImportError:  # python 2
+    try:
+        import mock
+    except ImportError:
+        mock = None
+
+
+class LRUCacheTest(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get_many(['a', 'b', 'c']), {'a': 1, 'c': 3})
+
+    def test_expires_entries(self):
+        cache = LRUCache(ttl=0.02)
+        cache.set('a', 1)
+        cache.set('b', 2, ttl=10)
+        time.sleep(0.03)
+        self.assertNotIn('a', cache)
+        self.assertEqual(cache.get('b'), 2)
+
+    def test_falsy_values_are_hits(self):
+        cache = LRUCache()
+        cache.set('a', None)
+        self.assertIn('a', cache)
+        self.assertEqual(cache.get_many(['a', 'b']), {'a': None})
+
+
+class Store(object):
+    def __init__(self, data):
+        self.data = data
+
+
+class Shared(object):
+    """Memcached-like backend."""
+    def __init__(self):
+        self.data = {}
+        self.requested = []
+
+    def get_many(self, keys):
+        self.requested.append(list(keys))
+        return dict((k, self.data[k]) for k in keys if k in self.data)
+
+    def set_many(self, mapping, timeout=None):
+        self.data.update(mapping)
+
+    def delete_many(self, keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+class StoreCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.shared = Shared()
+        self.cache = StoreCache(Store, shared=self.shared)
+
+    def test_keys_are_scoped_by_token(self):
+        self.assertNotEqual(self.cache.key('token1', 'doc'), self.cache.key('token2', 'doc'))
+
+    def test_partial_miss_only_asks_the_shared_backend_for_missing_keys(self):
+        keys = list(self.cache.keys('token', ['a', 'b', 'c']))
+        by_id = dict((i, k) for k, i in self.cache.keys('token', ['a', 'b', 'c']).items())
+        self.cache.local.set(by_id['a'], Store({'id': 'a'}))
+        self.shared.data[by_id['b']] = {'id': 'b'}
+        found = self.cache.get_many(keys)
+        self.assertEqual(sorted(found), sorted([by_id['a'], by_id['b']]))
+        self.assertEqual(found[by_id['b']].data, {'id': 'b'})
+        self.assertEqual(sorted(self.shared.requested[0]), sorted([by_id['b'], by_id['c']]))
+        self.assertIn(by_id['b'], self.cache.local)
+
+    def test_undecodable_shared_entries_are_misses(self):
+        self.cache.load = lambda data: None
+        key = self.cache.key('token', 'a')
+        self.shared.data[key] = b'stale'
+        self.assertEqual(self.cache.get_many([key]), {})
+
+
+class MissingCacheTest(unittest.TestCase):
+    def test_is_scoped_by_token(self):
+        missing = MissingCache()
+        missing.add('token1', ['a'])
+        self.assertEqual(missing.get('token1', ['a', 'b']), set(['a']))
+        self.assertEqual(missing.get('token2', ['a']), set())
+        missing.discard('token1', ['a'])
+        self.assertEqual(missing.get('token1', ['a']), set())
+
+
+class Doc(object):
+    def __init__(self, id):
+        self.id = id
+        self.data = {'documentID': id}
+
+
+@unittest.skipIf(Document is None or mock is None, 'barrel is not installed')
+class DocumentGetByIdsTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = StoreCache(Doc)
+        self.missing = MissingCache()
+        patches = [mock.patch.object(Document, 'cache', self.cache),
+                   mock.patch.object(Document, 'missing', self.missing)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def fetch(self, existing):
+        def signature(method=None, args=None, **kwargs):
+            return [Doc(i) for i in args[1] if i in existing]
+        return mock.patch.object(Document, 'signature', side_effect=signature)
+
+    def test_partial_miss_fetches_missing_ids_once_and_keeps_order(self):
+        self.cache.set(self.cache.key('token', 'b'), Doc('b'))
+        with self.fetch(set(['a', 'c'])) as signature:
+            documents = Document.get_by_ids('token', ['c', 'b', 'a', 'c'])
+        self.assertEqual([d.id for d in documents], ['c', 'b', 'a', 'c'])
+        signature.assert_called_once_with(method='getDocuments', args=['token', ['c', 'a']])
+
+    def test_missing_ids_are_skipped_and_remembered(self):
+        with self.fetch(set(['a'])) as signature:
+            self.assertEqual([d.id for d in Document.get_by_ids('token', ['a', 'x'])], ['a'])
+            self.assertEqual([d.id for d in Document.get_by_ids('token', ['a', 'x'])], ['a'])
+        self.assertEqual(signature.call_count, 1)
+        self.assertEqual(self.missing.get('token', ['x']), set(['x']))
@@ -0,0 +1,60 @@
+import unittest
+
+try:
+    from barrel_reaktor.category.models import CategoryIndex
+except ImportError:  # barrel or its dependencies are not installed
+    CategoryIndex = None
+
+
+class Cat(object):
+    def __init__(self, id, parent_id=False, name=None, children_ids=()):
+        self.id = id
+        self.parent_id = parent_id
+        self.name = name or id
+        self.children_ids = list(children_ids)
+
+
+@unittest.skipIf(CategoryIndex is None, 'barrel is not installed')
+class CategoryIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = CategoryIndex()
+        self.index.add([Cat('leaf', 'mid'), Cat('root', children_ids=['mid']), Cat('mid', 'root')])
+
+    def names(self, cat_id):
+        return [c.name for c in self.index.trail(cat_id)]
+
+    def test_trail_and_subtree(self):
+        self.assertEqual(self.names('leaf'), ['root', 'mid', 'leaf'])
+        self.assertEqual(self.index.subtree('root'), frozenset(['root', 'mid', 'leaf']))
+
+    def test_trail_stops_at_the_oldest_known_ancestor(self):
+        self.index.add([Cat('orphan', 'unknown')])
+        self.assertEqual(self.names('orphan'), ['orphan'])
+
+    def test_fresh_categories_are_kept(self):
+        self.index.add([Cat('mid', 'root', name='renamed')])
+        self.assertEqual(self.names('leaf'), ['root', 'mid', 'leaf'])
+
+    def test_expired_categories_are_replaced(self):
+        self.index.ttl = 0
+        self.index.add([Cat('mid', 'other', name='moved'), Cat('other')])
+        self.assertEqual(self.names('leaf'), ['other', 'moved', 'leaf'])
+        self.assertEqual(self.index.subtree('root'), frozenset(['root']))
+        self.assertEqual(self.index.subtree('other'), frozenset(['other', 'mid', 'leaf']))
+
+    def test_replace(self):
+        self.names('leaf')
+        self.index.add([Cat('root', name='renamed')], replace=True)
+        self.assertEqual(self.names('leaf'), ['renamed', 'mid', 'leaf'])
+
+    def test_trails_computed_while_adding_are_not_kept(self):
+        trails = self.index._trails
+        self.index.add([Cat('root', name='renamed')], replace=True)
+        # a trail computed from the dict in use before `add` reset it
+        trails['leaf'] = ()
+        self.assertEqual(self.names('leaf'), ['renamed', 'mid', 'leaf'])
+
+    def test_is_cleared_past_max_size(self):
+        self.index.max_size = 4
+        self.index.add([Cat('a'), Cat('b')])
+        self.assertEqual(sorted(self.index.categories), ['a', 'b'])
@@ -0,0 +1,63 @@
+import unittest
+
+from barrel_reaktor.cache import IsbnIndex, MissingCache
+
+try:
+    from barrel_reaktor.document.models import Document
+except ImportError:  # barrel or its dependencies are not installed
+    Document = None
+
+try:
+    from unittest import mock
+except ImportError:  # python 2
+    try:
+        import mock
+    except ImportError:
+        mock = None
+
+
+def hit(doc_id, isbn, type='CATALOG'):
+    return {'searchResult': {'documentID': doc_id, 'type': type, 'attributes': {'isbn': isbn}}}
+
+
+@unittest.skipIf(Document is None or mock is None, 'barrel is not installed')
+class IsbnLookupTest(unittest.TestCase):
+    def setUp(self):
+        self.index = IsbnIndex(scope=lambda token: 'nature')
+        self.missing = MissingCache()
+        for patch in [mock.patch.object(Document, 'isbn_index', self.index),
+                      mock.patch.object(Document, 'missing', self.missing)]:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def search(self, *results):
+        def signature(interface=None, method=None, data_converter=None, args=None):
+            return data_converter({'results': list(results), 'hasMore': False})
+        return mock.patch.object(Document, 'signature', side_effect=signature)
+
+    def test_catalog_documents_are_preferred(self):
+        results = [hit('copy', '111', 'USER'), hit('catalog', '111'), hit('other', '222', 'USER')]
+        with self.search(*results):
+            self.assertEqual(Document.get_by_isbn('token', '111').id, 'catalog')
+        self.index.local.clear()
+        with self.search(*results):
+            documents = Document.get_by_isbns('token', ['111', '222'])
+        self.assertEqual(dict((isbn, d.id) for isbn, d in documents.items()),
+                         {'111': 'catalog', '222': 'other'})
+
+    def test_only_catalog_documents_are_indexed(self):
+        with self.search(hit('catalog', '111'), hit('copy', '222', 'USER')):
+            Document.get_by_isbns('token', ['111', '222', '333'])
+        self.assertEqual(self.index.lookup('other token', ['111', '222', '333']), {'111': 'catalog'})
+        self.assertEqual(self.missing.get('token', ['isbn:222', 'isbn:333']), set(['isbn:333']))
+
+    def test_user_copy_is_not_indexed(self):
+        with self.search(hit('copy', '111', 'USER')):
+            self.assertEqual(Document.get_by_isbn('token', '111').id, 'copy')
+        self.assertEqual(self.index.lookup('other token', ['111']), {})
+
+    def test_isbns_known_to_be_missing_are_not_searched(self):
+        self.missing.add('token', ['isbn:333'])
+        with self.search() as signature:
+            self.assertEqual(Document.get_by_isbns('token', ['333']), {})
+        self.assertFalse(signature.called)
@@ -0,0 +1,41 @@
+import unittest
+
+try:
+    from holon import ReaktorArgumentError
+    from barrel_reaktor.document.models import Document
+    from barrel_reaktor.document_list.models import List
+except ImportError:  # barrel or its dependencies are not installed
+    List = None
+
+try:
+    from unittest import mock
+except ImportError:  # python 2
+    try:
+        import mock
+    except ImportError:
+        mock = None
+
+
+class Doc(object):
+    def __init__(self, id):
+        self.id = id
+
+
+@unittest.skipIf(List is None or mock is None, 'barrel is not installed')
+class HydrateTest(unittest.TestCase):
+    def get_by_ids(self, invalid):
+        def get_by_ids(token, doc_ids):
+            if invalid.intersection(doc_ids):
+                raise ReaktorArgumentError('Argument invalid')
+            return [Doc(i) for i in doc_ids if not i.startswith('gone')]
+        return mock.patch.object(Document, 'get_by_ids', side_effect=get_by_ids)
+
+    def test_only_invalid_ids_are_missing(self):
+        doc_ids = ['d%d' % i for i in range(10)] + ['bad', 'gone'] + ['e%d' % i for i in range(10)]
+        document_list = List({'documentIDs': doc_ids})
+        with self.get_by_ids(set(['bad'])) as get_by_ids:
+            hydration = document_list.hydrate('token', batch_size=8, workers=2)
+        self.assertEqual([d.id for d in hydration.documents], [i for i in doc_ids if i not in ('bad', 'gone')])
+        self.assertEqual(hydration.missing, ['bad', 'gone'])
+        # the rejected batch is bisected, not fetched id by id
+        self.assertLess(get_by_ids.call_count, 3 + 8)
@@ -0,0 +1,83 @@
+import threading
+import unittest
+
+try:
+    from holon import ReaktorArgumentError
+    from barrel_reaktor.document.loader import DocumentLoader
+except ImportError:  # barrel or holon are not installed
+    DocumentLoader = None
+
+
+class Doc(object):
+    def __init__(self, id):
+        self.id = id
+
+
+class Documents(object):
+    """Stand-in for `Document`, recording the `get_by_ids` calls."""
+    calls = []
+    existing = set()
+    error = None
+
+    @classmethod
+    def get_by_ids(cls, token, doc_ids):
+        cls.calls.append(list(doc_ids))
+        if cls.error is not None:
+            raise cls.error
+        return [Doc(i) for i in doc_ids if i in cls.existing]
+
+
+@unittest.skipIf(DocumentLoader is None, 'barrel is not installed')
+class DocumentLoaderTest(unittest.TestCase):
+    def setUp(self):
+        Documents.calls = []
+        Documents.existing = set(['a', 'b', 'c'])
+        Documents.error = None
+
+    def loader(self, window=None):
+        return DocumentLoader('token', window=window, document_class=Documents)
+
+    def test_queued_ids_are_fetched_at_once(self):
+        loader = self.loader()
+        deferreds = loader.load_many(['a', 'b', 'a'])
+        self.assertEqual([d.result().id for d in deferreds], ['a', 'b', 'a'])
+        self.assertEqual(loader.get_by_id('a').id, 'a')
+        self.assertEqual(Documents.calls, [['a', 'b']])
+
+    def test_concurrent_lookups_share_the_window(self):
+        loader = self.loader(window=0.05)
+        results = {}
+
+        def get(doc_id):
+            results[doc_id] = loader.get_by_id(doc_id).id
+        threads = [threading.Thread(target=get, args=(doc_id,)) for doc_id in 'abc']
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(results, {'a': 'a', 'b': 'b', 'c': 'c'})
+        self.assertEqual(len(Documents.calls), 1)
+        self.assertEqual(sorted(Documents.calls[0]), ['a', 'b', 'c'])
+
+    def test_missing_ids(self):
+        loader = self.loader()
+        missing = loader.load('x')
+        self.assertEqual([d.id for d in loader.get_by_ids(['a', 'x', 'b'])], ['a', 'b'])
+        self.assertRaises(ReaktorArgumentError, missing.result)
+        self.assertEqual(Documents.calls, [['x', 'a', 'b']])
+
+    def test_errors_are_raised_to_every_caller(self):
+        Documents.error = ValueError('down')
+        loader = self.loader()
+        deferreds = loader.load_many(['a', 'b'])
+        for deferred in deferreds:
+            self.assertRaises(ValueError, deferred.result)
+
+    def test_waiters_are_released_when_dispatch_is_interrupted(self):
+        Documents.error = SystemExit()
+        loader = self.loader(window=5)
+        deferred = loader.load('a')
+        # as the timer thread would, without its exception being reported
+        self.assertRaises(SystemExit, loader.dispatch)
+        self.assertTrue(deferred.done())
+        self.assertRaises(RuntimeError, deferred.result)
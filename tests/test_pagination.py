@@ -0,0 +1,23 @@
+import threading
+import unittest
+
+from barrel_reaktor.pagination import map_concurrently
+
+
+class MapConcurrentlyTest(unittest.TestCase):
+    def test_keeps_the_order_of_the_items(self):
+        self.assertEqual(map_concurrently(lambda i: i * 2, range(10), 4), [i * 2 for i in range(10)])
+
+    def test_runs_in_the_calling_thread_when_not_concurrent(self):
+        current = threading.current_thread()
+        for items, workers in (([1], 4), ([1, 2], 1)):
+            threads = map_concurrently(lambda i: threading.current_thread(), items, workers)
+            self.assertEqual(threads, [current] * len(items))
+
+    def test_errors_are_raised(self):
+        def func(i):
+            if i == 3:
+                raise ValueError(i)
+            return i
+        self.assertRaises(ValueError, map_concurrently, func, range(5), 2)
+
@@ -0,0 +1,139 @@
+import threading
+import time
+import unittest
+
+try:
+    from barrel_reaktor import resilience
+except ImportError:  # holon is not installed
+    resilience = None
+
+
+@unittest.skipIf(resilience is None, 'holon is not installed')
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.breaker = resilience.CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.allow()
+        self.breaker.failure()
+        self.assertEqual(self.breaker.state, self.breaker.CLOSED)
+        self.breaker.allow()
+        self.breaker.failure()
+        self.assertEqual(self.breaker.state, self.breaker.OPEN)
+        self.assertRaises(resilience.CircuitOpenError, self.breaker.allow)
+        self.assertEqual(self.breaker.metrics['trips'], 1)
+        self.assertEqual(self.breaker.metrics['rejected'], 1)
+
+    def test_success_resets_failure_count(self):
+        self.breaker.failure()
+        self.breaker.success()
+        self.breaker.failure()
+        self.assertEqual(self.breaker.state, self.breaker.CLOSED)
+
+    def test_half_open_lets_a_single_probe_through(self):
+        self.breaker.failure()
+        self.breaker.failure()
+        time.sleep(0.06)
+        self.breaker.allow()
+        self.assertEqual(self.breaker.state, self.breaker.HALF_OPEN)
+        self.assertRaises(resilience.CircuitOpenError, self.breaker.allow)
+        self.breaker.success()
+        self.assertEqual(self.breaker.state, self.breaker.CLOSED)
+        self.breaker.allow()
+
+    def test_failed_probe_opens_again(self):
+        self.breaker.failure()
+        self.breaker.failure()
+        time.sleep(0.06)
+        self.breaker.allow()
+        self.breaker.failure()
+        self.assertEqual(self.breaker.state, self.breaker.OPEN)
+        self.assertRaises(resilience.CircuitOpenError, self.breaker.allow)
+        self.assertEqual(self.breaker.metrics['trips'], 2)
+
+
+@unittest.skipIf(resilience is None, 'holon is not installed')
+class PolicyTest(unittest.TestCase):
+    def policy(self, **kwargs):
+        kwargs.setdefault('min_samples', 3)
+        kwargs.setdefault('min_delay', 0.01)
+        return resilience.Policy(**kwargs)
+
+    def warm_up(self, policy, method='getDocument', latency=0.01):
+        for _ in range(policy.min_samples):
+            policy.call('WSDocMgmt', method, lambda: time.sleep(latency))
+
+    def test_failures_trip_the_interface_breaker(self):
+        policy = self.policy(failure_threshold=2)
+
+        def fail():
+            raise IOError()
+        for _ in range(2):
+            self.assertRaises(IOError, policy.call, 'WSDocMgmt', 'getDocument', fail)
+        self.assertRaises(resilience.CircuitOpenError, policy.call, 'WSDocMgmt', 'getDocument', lambda: 1)
+        self.assertEqual(policy.call('WSShopMgmt', 'getBasket', lambda: 1), 1)
+
+    def test_ignored_errors_do_not_trip_the_breaker(self):
+        policy = self.policy(failure_threshold=1, ignored=(KeyError, ))
+
+        def fail():
+            raise KeyError()
+        self.assertRaises(KeyError, policy.call, 'WSDocMgmt', 'getDocument', fail)
+        self.assertEqual(policy.breaker('WSDocMgmt').state, resilience.CircuitBreaker.CLOSED)
+
+    def test_deadline(self):
+        policy = self.policy(deadline=0.05)
+        start = time.time()
+        self.assertRaises(resilience.DeadlineExceeded, policy.call, 'WSDocMgmt', 'getDocument',
+                          lambda: time.sleep(0.5))
+        self.assertLess(time.time() - start, 0.4)
+        self.assertEqual(policy.metrics()['WSDocMgmt']['timeouts'], 1)
+        self.assertEqual(policy.call('WSDocMgmt', 'getDocument', lambda: 1), 1)
+
+    def test_no_hedge_before_min_samples(self):
+        policy = self.policy()
+        calls = []
+
+        def func():
+            calls.append(1)
+            time.sleep(0.05)
+        policy.call('WSDocMgmt', 'getDocument', func)
+        self.assertEqual(len(calls), 1)
+
+    def test_slow_call_is_hedged_and_hedge_wins(self):
+        policy = self.policy()
+        self.warm_up(policy)
+        attempts = []
+        lock = threading.Lock()
+
+        def func():
+            with lock:
+                attempts.append(1)
+                first = len(attempts) == 1
+            if first:
+                time.sleep(1)
+                return 'first'
+            return 'hedge'
+        start = time.time()
+        self.assertEqual(policy.call('WSDocMgmt', 'getDocument', func), 'hedge')
+        self.assertLess(time.time() - start, 0.5)
+        counters = policy.metrics()['WSDocMgmt']
+        self.assertEqual((counters['hedges'], counters['hedge_wins']), (1, 1))
+
+    def test_only_hedged_methods_are_hedged(self):
+        policy = self.policy(hedged=('getDocument', ))
+        self.warm_up(policy, 'changeDocumentAttributes')
+        calls = []
+
+        def func():
+            calls.append(1)
+            time.sleep(0.1)
+        policy.call('WSDocMgmt', 'changeDocumentAttributes', func)
+        self.assertEqual(len(calls), 1)
+
+    def test_error_of_the_only_attempt_is_raised(self):
+        policy = self.policy(deadline=1)
+
+        def fail():
+            raise IOError()
+        self.assertRaises(IOError, policy.call, 'WSDocMgmt', 'getDocument', fail)
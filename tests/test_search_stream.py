@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import random
+import unittest
+
+from barrel_reaktor import RpcError
+
+try:
+    from barrel_reaktor.search.stream import SearchStream
+except ImportError:  # barrel or its dependencies are not installed
+    SearchStream = None
+
+
+class ChunkedFile(object):
+    """File-like object returning reads of random sizes, at most `size`."""
+    def __init__(self, data, rng, max_size=64):
+        self.fp = io.BytesIO(data)
+        self.rng = rng
+        self.max_size = max_size
+        self.closed = False
+
+    def read(self, size):
+        return self.fp.read(min(size, self.rng.randint(1, self.max_size)))
+
+    def close(self):
+        self.closed = True
+
+
+TRICKY = [
+    u'quote " and backslash \\ inside',
+    u'brackets ] } [ { and a comma, a colon:',
+    u'escaped \\" quote before a bracket ]',
+    u'non ascii: été, 日本語, \U0001F4D6',
+    u'\\',
+    u'',
+]
+
+
+def response(count, error=None):
+    results = [{'searchResult': {'documentID': 'doc%d' % i, 'title': TRICKY[i % len(TRICKY)],
+                                 'price': 1234567.125 * (i + 1), 'tags': [[], {}, [TRICKY[i % 3]]]},
+                'relevance': i / 7.0}
+               for i in range(count)]
+    result = {'relatedObjects': {'language': [{'name': u'ünïcode ]', 'count': 123456789}]},
+              'results': results, 'numberOfResults': 123456789012, 'hasMore': False}
+    envelope = {'id': 1, 'error': error, 'result': None if error else result}
+    return result, json.dumps(envelope, ensure_ascii=False).encode('utf-8')
+
+
+@unittest.skipIf(SearchStream is None, 'barrel is not installed')
+class SearchStreamTest(unittest.TestCase):
+    def test_random_chunks(self):
+        rng = random.Random(0)
+        for count in range(0, 13):
+            expected, data = response(count)
+            for chunk_size in (1, 2, 3, 7, 64):
+                fp = ChunkedFile(data, rng)
+                stream = SearchStream(fp, chunk_size=chunk_size)
+                items = [item.data for item in stream]
+                self.assertEqual(items, expected['results'])
+                self.assertEqual(stream.result.data['numberOfResults'], 123456789012)
+                self.assertEqual(stream.result.data['relatedObjects'], expected['relatedObjects'])
+                self.assertTrue(fp.closed)
+
+    def test_numbers_split_across_chunks(self):
+        data = b'{"results": [], "numberOfResults": 1234567890123456, "hasMore": false}'
+        stream = SearchStream(ChunkedFile(data, random.Random(1), max_size=2), envelope=False, chunk_size=1)
+        self.assertEqual(list(stream), [])
+        self.assertEqual(stream.result.data['numberOfResults'], 1234567890123456)
+
+    def test_skip_stats(self):
+        expected, data = response(3)
+        stream = SearchStream(ChunkedFile(data, random.Random(2)), skip_stats=True, chunk_size=5)
+        self.assertEqual([item.data for item in stream], expected['results'])
+        self.assertNotIn('relatedObjects', stream.result.data)
+
+    def test_error_envelope(self):
+        _, data = response(0, error={'code': 500, 'message': u'Argument "x" ] invalid'})
+        fp = ChunkedFile(data, random.Random(3))
+        stream = SearchStream(fp, chunk_size=4)
+        self.assertRaises(RpcError, list, stream)
+        self.assertTrue(fp.closed)
+
+    def test_truncated_response(self):
+        _, data = response(2)
+        fp = ChunkedFile(data[:-10], random.Random(4))
+        self.assertRaises(ValueError, list, SearchStream(fp, chunk_size=8))
+        self.assertTrue(fp.closed)
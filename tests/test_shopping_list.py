@@ -0,0 +1,55 @@
+import unittest
+
+try:
+    from barrel_reaktor.basket.models import Basket
+    from barrel_reaktor.shopping_list.models import Membership, Preorderlist, Wishlist, WishlistItem
+except ImportError:  # barrel or its dependencies are not installed
+    Basket = None
+
+try:
+    from unittest import mock
+except ImportError:  # python 2
+    try:
+        import mock
+    except ImportError:
+        mock = None
+
+
+def shopping_list(*doc_ids):
+    return {'entries': [{'document': {'documentID': doc_id}} for doc_id in doc_ids]}
+
+
+@unittest.skipIf(Basket is None or mock is None, 'barrel is not installed')
+class MembershipTest(unittest.TestCase):
+    def patch(self, *args, **kwargs):
+        patch = mock.patch.object(*args, **kwargs)
+        started = patch.start()
+        self.addCleanup(patch.stop)
+        return started
+
+    def test_list_is_fetched_for_every_check_by_default(self):
+        self.assertIsNone(Wishlist.membership)
+        signature = self.patch(Wishlist, 'signature', return_value=Wishlist(shopping_list('a')))
+        self.assertTrue(Wishlist.contains('token', 'a'))
+        self.assertEqual(Wishlist.contains_many('token', ['a', 'b']), {'a': True, 'b': False})
+        self.assertEqual(signature.call_count, 2)
+
+    def test_membership_is_updated_on_write(self):
+        self.patch(Wishlist, 'membership', Membership())
+        signature = self.patch(Wishlist, 'signature', return_value=Wishlist(shopping_list('a')))
+        self.patch(WishlistItem, 'signature', return_value=True)
+        self.assertFalse(Wishlist.contains('token', 'b'))
+        WishlistItem.add_to_list('token', 'b')
+        self.assertTrue(Wishlist.contains('token', 'b'))
+        WishlistItem.remove_from_list('token', 'a')
+        self.assertFalse(Wishlist.contains('token', 'a'))
+        self.assertEqual(signature.call_count, 1)
+
+    def test_checkout_invalidates_the_preorder_list(self):
+        self.patch(Preorderlist, 'membership', Membership())
+        lists = [Preorderlist(shopping_list()), Preorderlist(shopping_list('a'))]
+        self.patch(Preorderlist, 'signature', side_effect=lambda **kwargs: lists.pop(0))
+        self.patch(Basket, 'signature')
+        self.assertFalse(Preorderlist.contains('token', 'a'))
+        Basket.checkout('token', 'basket', {})
+        self.assertTrue(Preorderlist.contains('token', 'a'))
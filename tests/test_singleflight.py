@@ -0,0 +1,68 @@
+import threading
+import time
+import unittest
+
+from barrel_reaktor.singleflight import Group
+
+
+class GroupTest(unittest.TestCase):
+    def setUp(self):
+        self.group = Group()
+        self.calls = 0
+        self.release = threading.Event()
+
+    def slow(self, value=None, error=None):
+        def func():
+            self.calls += 1
+            self.release.wait(5)
+            if error is not None:
+                raise error
+            return value
+        return func
+
+    def run_concurrently(self, func, count=5, key='key'):
+        results = [None] * count
+
+        def target(index):
+            try:
+                results[index] = ('value', self.group.do(key, func))
+            except Exception as e:
+                results[index] = ('error', e)
+        threads = [threading.Thread(target=target, args=(i, )) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+        return results
+
+    def test_concurrent_calls_share_one_execution(self):
+        value = object()
+        results = self.run_concurrently(self.slow(value))
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [('value', value)] * 5)
+
+    def test_error_is_raised_to_every_caller(self):
+        error = ValueError('boom')
+        results = self.run_concurrently(self.slow(error=error))
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [('error', error)] * 5)
+
+    def test_finished_calls_are_not_shared(self):
+        self.release.set()
+        self.group.do('key', self.slow(1))
+        self.group.do('key', self.slow(2))
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(self.group._flights, {})
+
+    def test_failed_calls_are_not_shared(self):
+        self.release.set()
+        self.assertRaises(ValueError, self.group.do, 'key', self.slow(error=ValueError()))
+        self.assertEqual(self.group.do('key', self.slow(2)), 2)
+
+    def test_key_ignores_dict_ordering(self):
+        a = Group.key('WSDocMgmt', 'getDocuments', None, ['token', {'a': 1, 'b': 2}])
+        b = Group.key('WSDocMgmt', 'getDocuments', None, ['token', {'b': 2, 'a': 1}])
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, Group.key('WSDocMgmt', 'getDocument', None, ['token', {'a': 1, 'b': 2}]))